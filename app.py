@@ -1,14 +1,46 @@
 # savas_smile_final.py
 from flask import Flask, render_template_string, request, redirect, url_for, flash, session
-from flask import send_from_directory, jsonify
+from flask import send_from_directory, jsonify, g, Request
+from werkzeug.exceptions import NotFound, RequestEntityTooLarge
 import webbrowser
 import threading
 import os
+import queue
 import sqlite3
-from datetime import datetime
+import contextlib
+import random
+import time
+import atexit
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict, deque
 import hashlib
+import base64
 import secrets
 import functools
+import itertools
+import gzip
+import re
+import io
+import json
+import shutil
+import csv
+import zlib
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+import tracemalloc
+import click
+
+try:
+    import brotli  # optionnel : variante Content-Encoding br des pages pré-rendues
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, ImageOps, features as pil_features  # optionnel : variantes des photos
+except ImportError:
+    Image = None
 
 # ==================== CONFIGURATION ====================
 app = Flask(__name__)
@@ -19,12 +51,252 @@ app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 app.config['ADMIN_PATH'] = 'admin-secret-1234abcd'  # URL fixe pour le portfolio
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+app.config['ASSETS_FOLDER'] = 'static/assets'  # CSS/JS extraits des templates, nommés par hash
 
 # Créer les dossiers
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(app.config['ASSETS_FOLDER'], exist_ok=True)
 
 # Base de données
 DATABASE = 'savas_smile_final.db'
+app.config['DB_POOL_SIZE'] = 8  # connexions inactives conservées pour réutilisation
+app.config['SQLITE_PRAGMAS'] = {'foreign_keys': 'ON'}  # appliqués une seule fois par connexion
+app.config['DB_STORAGE_MODE'] = 'wal'  # 'wal' (lecteurs et écrivains concurrents) ou 'rollback'
+app.config['DB_BUSY_TIMEOUT_MS'] = 5000  # attente max d'un verrou côté SQLite
+app.config['DB_WRITE_RETRIES'] = 5  # nouvelles tentatives après "database is locked"
+app.config['DB_RETRY_BASE_DELAY'] = 0.02  # secondes, doublé à chaque tentative
+app.config['DB_RETRY_MAX_DELAY'] = 0.5
+app.config['BOOKING_BATCH_SIZE'] = 64  # réservations max par transaction
+app.config['BOOKING_MAX_LINGER_MS'] = 5  # attente max pour compléter un lot
+app.config['BOOKING_SUBMIT_TIMEOUT'] = 10  # secondes avant d'abandonner une réservation
+app.config['OPENING_HOURS'] = {  # jour de la semaine (0 = lundi) : plages d'ouverture
+    0: (('09:00', '12:30'), ('14:00', '19:00')),
+    1: (('09:00', '12:30'), ('14:00', '19:00')),
+    2: (('09:00', '12:30'), ('14:00', '19:00')),
+    3: (('09:00', '12:30'), ('14:00', '19:00')),
+    4: (('09:00', '12:30'), ('14:00', '19:00')),
+    5: (('09:00', '13:00'),),
+}
+app.config['TREATMENT_DURATIONS'] = {  # minutes
+    'consultation': 30,
+    'blanchiment': 60,
+    'invisalign': 45,
+    'implant': 90,
+}
+app.config['SLOT_STEP_MINUTES'] = 15  # créneaux proposés tous les quarts d'heure depuis l'ouverture
+app.config['BOOKING_MIN_NOTICE_MINUTES'] = 120  # délai minimum avant un créneau
+app.config['BOOKING_HORIZON_DAYS'] = 90  # réservation possible jusqu'à J+90
+app.config['RESPONSE_CACHE_SIZE'] = 32  # entrées max (éviction LRU)
+app.config['RESPONSE_CACHE_TTL'] = 60  # secondes
+app.config['APPOINTMENTS_PAGE_SIZE'] = 50
+app.config['APPOINTMENTS_MAX_PAGE_SIZE'] = 200
+app.config['SEARCH_MAX_CANDIDATES'] = 2000  # correspondances les plus récentes classées par pertinence
+app.config['BULK_MAX_IDS'] = 1000  # rendez-vous max par changement de statut groupé
+app.config['STREAM_FETCH_SIZE'] = 500  # lignes lues et sérialisées par morceau
+app.config['IMPORT_FOLDER'] = 'imports'  # fichiers téléversés le temps de l'import (hors static/)
+app.config['IMPORT_CHUNK_ROWS'] = 50000  # lignes insérées par transaction d'import
+app.config['IMPORT_MAX_BYTES'] = 512 * 1024 * 1024  # remplace MAX_CONTENT_LENGTH pour /import
+app.config['IMPORT_MAX_ERRORS'] = 100  # erreurs détaillées conservées dans le rapport
+app.config['CHANGES_MAX_BATCH'] = 500  # entrées du journal renvoyées par appel /changes
+app.config['CHANGE_LOG_RETENTION_DAYS'] = 30
+app.config['EVENTS_HEARTBEAT_SECONDS'] = 15
+app.config['EVENTS_CLIENT_BUFFER'] = 100  # événements en attente max par client SSE
+app.config['EVENTS_HISTORY'] = 500  # événements conservés pour la reprise Last-Event-ID
+app.config['HOME_CACHE_CONTROL'] = 'public, max-age=600'
+app.config['PUBLIC_GALLERY_SIZE'] = 6  # cas affichés d'emblée sur la page d'accueil
+app.config['PUBLIC_GALLERY_RECHECK_SECONDS'] = 5  # délai max pour voir une écriture d'un autre worker ou de la CLI
+app.config['PUBLIC_GALLERY_MAX_PAGE_SIZE'] = 24
+app.config['IMAGE_WORKERS'] = 2  # processus dédiés au redimensionnement/encodage
+app.config['IMAGE_WIDTHS'] = (320, 640, 1280)  # largeurs des variantes (jamais agrandies)
+app.config['IMAGE_MAX_WIDTH'] = 2048  # l'original est ramené à cette largeur
+app.config['IMAGE_FORMATS'] = ('avif', 'webp')  # ignorés si l'encodeur Pillow manque
+app.config['IMAGE_QUALITY'] = 80
+app.config['IMAGE_RESIZE_WIDTHS'] = (160, 320, 480, 640, 960, 1280, 1920)  # largeurs servies par /img
+app.config['IMAGE_RESIZE_TIMEOUT'] = 30  # secondes d'attente d'un rendu /img avant un 503
+app.config['IMAGE_CACHE_FOLDER'] = 'static/cache/img'
+app.config['IMAGE_CACHE_BYTES'] = 256 * 1024 * 1024  # budget disque des variantes à la demande
+
+# Modes de stockage : PRAGMAs appliqués à l'ouverture de chaque connexion
+STORAGE_MODES = {
+    'wal': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+    'rollback': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+}
+
+# ==================== CONNEXIONS DB ====================
+class ConnectionPool:
+    """Pool borné de connexions SQLite réutilisées d'une requête à l'autre."""
+
+    def __init__(self, database, max_idle=8, pragmas=None, busy_timeout_ms=5000):
+        self.database = database
+        self.max_idle = max_idle
+        self.pragmas = dict(pragmas or {})
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    def _connect(self):
+        # check_same_thread=False : une connexion rendue au pool peut être
+        # reprise par un autre thread du serveur
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        # Ne jamais remettre dans le pool une transaction entamée
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+db_pool = ConnectionPool(
+    DATABASE,
+    max_idle=app.config['DB_POOL_SIZE'],
+    pragmas={
+        **app.config['SQLITE_PRAGMAS'],
+        **STORAGE_MODES[app.config['DB_STORAGE_MODE']],
+    },
+    busy_timeout_ms=app.config['DB_BUSY_TIMEOUT_MS'],
+)
+# Enregistré avant booking_writer et image_pipeline : atexit le lance après
+# eux. La dernière connexion fermée supprime les fichiers -wal/-shm
+atexit.register(db_pool.close_all)
+
+def get_db():
+    """Connexion de la requête courante, rendue au pool au teardown."""
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        db_pool.release(conn)
+
+# ==================== ÉCRITURES ET CONTENTION ====================
+class DatabaseBusy(Exception):
+    """Verrou d'écriture toujours indisponible après toutes les tentatives."""
+
+class WriteStats:
+    """Compteurs de contention exposés aux admins pour dimensionner la concurrence."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.lock_waits = 0
+        self.retries = 0
+        self.busy_failures = 0
+        self.wait_seconds = 0.0
+
+    def record(self, retries, waited, failed=False):
+        with self._lock:
+            self.writes += 1
+            self.retries += retries
+            self.wait_seconds += waited
+            if retries:
+                self.lock_waits += 1
+            if failed:
+                self.busy_failures += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'writes': self.writes,
+                'lock_waits': self.lock_waits,
+                'retries': self.retries,
+                'busy_failures': self.busy_failures,
+                'wait_ms': round(self.wait_seconds * 1000, 1),
+            }
+
+write_stats = WriteStats()
+
+def _is_lock_error(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+def run_write(work, conn=None):
+    """Exécute work(cursor) dans une transaction IMMEDIATE avec reprise sur verrou.
+
+    Chaque échec "database is locked" est suivi d'une attente exponentielle
+    avec jitter avant une nouvelle tentative ; au-delà de DB_WRITE_RETRIES,
+    DatabaseBusy est levée.
+    """
+    conn = conn if conn is not None else get_db()
+    max_retries = app.config['DB_WRITE_RETRIES']
+    base_delay = app.config['DB_RETRY_BASE_DELAY']
+    max_delay = app.config['DB_RETRY_MAX_DELAY']
+    waited = 0.0
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            # Prendre le verrou d'écriture d'emblée évite les SQLITE_BUSY
+            # en cours de transaction quand un lecteur veut écrire à son tour
+            conn.execute('BEGIN IMMEDIATE')
+            result = work(conn.cursor())
+            conn.commit()
+            write_stats.record(attempt, waited)
+            return result
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not _is_lock_error(e):
+                raise
+            waited += time.perf_counter() - started
+            if attempt >= max_retries:
+                write_stats.record(attempt, waited, failed=True)
+                raise DatabaseBusy(str(e)) from e
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            delay = random.uniform(delay / 2, delay)
+            time.sleep(delay)
+            waited += delay
+            attempt += 1
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+def busy_response(message, retry_after=1, **extra):
+    response = jsonify({'success': False, 'error': message, **extra})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def db_error_response(error):
+    if isinstance(error, DatabaseBusy):
+        return busy_response('Service momentanément surchargé, veuillez réessayer.')
+    return jsonify({'success': False, 'error': str(error)})
 
 # ==================== FONCTIONS UTILITAIRES ====================
 def hash_password(password):
@@ -41,11 +313,579 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# ==================== INITIALISATION DB ====================
-def init_db():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
+# ==================== DISPONIBILITÉS ====================
+class SlotUnavailable(Exception):
+    pass
+
+# Index d'intervalles : les RDV actifs triés par (jour, heure de début) dans
+# idx_appointments_slot. Un RDV qui chevauche [début, fin[ commence au plus
+# tôt "durée max" avant début : la recherche se limite à cette plage de
+# l'index (O(log n) + les quelques RDV de la plage), jamais à toute la table.
+BOOKED_SLOTS_SQL = '''
+    SELECT appointment_time, duration FROM appointments
+    WHERE appointment_date = ? AND appointment_time >= ? AND appointment_time < ?
+      AND status != 'cancelled'
+    ORDER BY appointment_time
+'''
+
+def _minutes(hhmm):
+    return int(hhmm[:2]) * 60 + int(hhmm[3:5])
+
+def _hhmm(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+def treatment_duration(treatment):
+    durations = app.config['TREATMENT_DURATIONS']
+    if treatment not in durations:
+        raise ValueError(f'Traitement inconnu : {treatment}')
+    return durations[treatment]
+
+def longest_treatment():
+    return max(app.config['TREATMENT_DURATIONS'].values())
+
+def booked_intervals(conn, day, start=0, end=24 * 60):
+    """Intervalles [début, fin[ (minutes) des RDV actifs du jour qui chevauchent [start, end[.
+
+    La fenêtre ne remonte que de la durée la plus longue : aucune ligne
+    (réservation ou import) ne peut la dépasser.
+    """
+    window_start = max(0, start - longest_treatment())
+    intervals = []
+    for slot, duration in conn.execute(BOOKED_SLOTS_SQL, (day, _hhmm(window_start), _hhmm(end))):
+        begin = _minutes(slot)
+        if begin + duration > start:
+            intervals.append((begin, begin + duration))
+    return intervals
+
+def bookable_from(day):
+    """Première minute réservable du jour (délai minimum compris), None hors fenêtre de réservation."""
+    earliest = datetime.now() + timedelta(minutes=app.config['BOOKING_MIN_NOTICE_MINUTES'])
+    last_day = (datetime.now() + timedelta(days=app.config['BOOKING_HORIZON_DAYS'])).date()
+    if day < earliest.date() or day > last_day:
+        return None
+    if day == earliest.date():
+        return earliest.hour * 60 + earliest.minute
+    return 0
+
+def candidate_slots(day, duration):
+    """Débuts possibles selon les horaires d'ouverture, sans tenir compte des RDV."""
+    start_from = bookable_from(day)
+    if start_from is None:
+        return []
+    step = app.config['SLOT_STEP_MINUTES']
+    slots = []
+    for opening, closing in app.config['OPENING_HOURS'].get(day.weekday(), ()):
+        begin, close = _minutes(opening), _minutes(closing)
+        if begin < start_from:
+            begin += -(-(start_from - begin) // step) * step
+        slots.extend(range(begin, close - duration + 1, step))
+    return slots
+
+def available_slots(conn, day, duration):
+    booked = booked_intervals(conn, day.isoformat())
+    return [
+        _hhmm(start) for start in candidate_slots(day, duration)
+        if not any(begin < start + duration and end > start for begin, end in booked)
+    ]
+
+def requested_slot(day, slot, treatment):
+    """Valide le créneau demandé ; renvoie (jour, heure, durée) prêts pour l'insertion."""
+    duration = treatment_duration(treatment)
+    if not day or not slot:
+        raise ValueError('Choisissez une date et un créneau')
+    day = datetime.fromisoformat(parse_day(day, 'appointment_date')).date()
+    if not re.fullmatch(r'\d{2}:\d{2}', slot) or _minutes(slot) not in candidate_slots(day, duration):
+        raise ValueError("Ce créneau n'est pas proposé à la réservation")
+    return day.isoformat(), slot, duration
+
+# ==================== ÉCRITURE GROUPÉE DES RDV ====================
+APPOINTMENT_INSERT_SQL = '''
+    INSERT INTO appointments (full_name, email, phone, treatment_type, message,
+                              appointment_date, appointment_time, duration)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+class BookingWriter:
+    """Thread unique qui insère les réservations par lots (group commit).
+
+    Les requêtes déposent leurs lignes dans une file et attendent un Future ;
+    le thread vide la file, insère le lot dans une seule transaction (un seul
+    fsync) puis résout chaque Future avec l'id créé.
+    """
+
+    _STOP = object()
+
+    def __init__(self, pool, batch_size=64, max_linger=0.005):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.max_linger = max_linger
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='booking-writer', daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, params):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((params, future))
+        return future
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is self._STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                # Terminer le lot en cours puis s'arrêter
+                self._queue.put(self._STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _write(self, conn, batch):
+        def insert_all(cursor):
+            outcomes = []
+            for params, _ in batch:
+                # Un SAVEPOINT par ligne : une réservation invalide n'annule
+                # pas celles des autres patients du même lot
+                cursor.execute('SAVEPOINT booking')
+                try:
+                    # Vérifié sous le verrou d'écriture : deux demandes du
+                    # même créneau, même dans un seul lot, ne passent pas toutes les deux
+                    day, slot, duration = params[5:8]
+                    start = _minutes(slot)
+                    if booked_intervals(cursor, day, start, start + duration):
+                        raise SlotUnavailable('Ce créneau vient d\'être réservé, choisissez-en un autre')
+                    cursor.execute(APPOINTMENT_INSERT_SQL, params)
+                    outcomes.append((cursor.lastrowid, None))
+                except (sqlite3.IntegrityError, SlotUnavailable) as e:
+                    cursor.execute('ROLLBACK TO booking')
+                    outcomes.append((None, e))
+                cursor.execute('RELEASE booking')
+            return outcomes
+        return run_write(insert_all, conn)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Une requête qui a abandonné (délai dépassé) a annulé son Future :
+            # sa ligne n'est pas écrite. Les autres ne peuvent plus être annulées
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                with self.pool.connection() as conn:
+                    outcomes = self._write(conn, batch)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._stats_lock:
+                self.batches += 1
+                self.rows += len(batch)
+            for (_, future), (new_id, error) in zip(batch, outcomes):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(new_id)
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout=5)
+
+    def snapshot(self):
+        with self._stats_lock:
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'avg_batch_size': round(self.rows / self.batches, 2) if self.batches else 0,
+                'queued': self._queue.qsize(),
+            }
+
+booking_writer = BookingWriter(
+    db_pool,
+    batch_size=app.config['BOOKING_BATCH_SIZE'],
+    max_linger=app.config['BOOKING_MAX_LINGER_MS'] / 1000,
+)
+atexit.register(booking_writer.close)
+
+# ==================== CACHE DES RÉPONSES ====================
+class ResponseCache:
+    """Cache LRU borné avec TTL et single-flight.
+
+    Les clés incluent les versions des tables lues : toute écriture change
+    la clé, l'ancienne entrée n'est plus jamais servie et finit évincée.
+    Des calculs concurrents pour une même clé attendent le premier.
+    """
+
+    def __init__(self, max_entries=32, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+            }
+
+response_cache = ResponseCache(
+    max_entries=app.config['RESPONSE_CACHE_SIZE'],
+    ttl=app.config['RESPONSE_CACHE_TTL'],
+)
+
+def table_state(conn, *tables):
+    """Versions des tables (incrémentées par trigger) et date de dernière écriture."""
+    names = [f'version_{table}' for table in tables]
+    placeholders = ', '.join('?' for _ in names)
+    rows = {
+        name: (value, updated_at) for name, value, updated_at in conn.execute(
+            f"SELECT name, value, updated_at FROM counters WHERE name IN ({placeholders})", names
+        )
+    }
+    versions = tuple(rows.get(name, (0, None))[0] for name in names)
+    stamps = [rows[name][1] for name in names if name in rows and rows[name][1]]
+    last_modified = None
+    if stamps:
+        last_modified = datetime.strptime(max(stamps), '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return versions, last_modified
+
+def conditional_json(tables, build, *key_parts, public=False):
+    """GET conditionnel : ETag fort dérivé des versions de tables.
+
+    Si le client présente l'ETag courant (ou une date If-Modified-Since
+    suffisante), on répond 304 sans lire une seule ligne ; sinon
+    build(conn, versions) construit la réponse. public=True autorise les
+    caches partagés (données publiques), toujours avec revalidation.
+    """
+    conn = get_db()
+    versions, last_modified = table_state(conn, *tables)
+    etag = hashlib.sha1(repr((request.path, key_parts, versions)).encode('utf-8')).hexdigest()
+    
+    not_modified = request.if_none_match.contains(etag)
+    if not request.if_none_match and request.if_modified_since and last_modified:
+        not_modified = last_modified <= request.if_modified_since
+    
+    if not_modified:
+        response = app.response_class(status=304)
+    else:
+        response = build(conn, versions)
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Toujours revalider : les données ne doivent jamais être servies périmées
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def json_bytes(payload):
+    return app.json.dumps(payload).encode('utf-8')
+
+# ==================== ÉVÉNEMENTS TEMPS RÉEL (SSE) ====================
+class Subscriber:
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.pending = []
+        self.overflowed = False
+        self.ready = threading.Condition()
+
+class EventBroadcaster:
+    """Diffuse chaque événement, sérialisé une seule fois, à tous les clients SSE.
+
+    Chaque client a un tampon borné : un client trop lent est marqué
+    "overflowed" et reçoit un événement resync au lieu de faire grossir la
+    mémoire. Un historique circulaire permet la reprise via Last-Event-ID.
+    """
+
+    def __init__(self, client_buffer=100, history=500):
+        self.client_buffer = client_buffer
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._next_id = 1
+
+    def publish(self, name, payload):
+        data = app.json.dumps(payload)
+        with self._lock:
+            event = (self._next_id, name, data)
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            with sub.ready:
+                if len(sub.pending) >= sub.max_pending:
+                    sub.overflowed = True
+                    sub.pending.clear()
+                else:
+                    sub.pending.append(event)
+                sub.ready.notify()
+
+    def subscribe(self, last_event_id=None):
+        sub = Subscriber(self.client_buffer)
+        with self._lock:
+            if last_event_id is not None:
+                oldest = self._history[0][0] if self._history else self._next_id
+                if last_event_id >= self._next_id or last_event_id < oldest - 1:
+                    # Identifiant inconnu (redémarrage) ou trop ancien
+                    sub.overflowed = True
+                else:
+                    sub.pending.extend(e for e in self._history if e[0] > last_event_id)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def wait(self, sub, timeout):
+        with sub.ready:
+            if not sub.pending and not sub.overflowed:
+                sub.ready.wait(timeout)
+            events, sub.pending = sub.pending, []
+            return events
+
+    def latest_id(self):
+        with self._lock:
+            return self._next_id - 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'clients': len(self._subscribers), 'last_event_id': self._next_id - 1}
+
+broadcaster = EventBroadcaster(
+    client_buffer=app.config['EVENTS_CLIENT_BUFFER'],
+    history=app.config['EVENTS_HISTORY'],
+)
+
+def publish_change(table, op, row_id, conn=None):
+    """Publie la ligne modifiée (ou l'id supprimé) avec les statistiques à jour."""
+    publish_changes(table, op, [row_id], conn)
+
+def publish_changes(table, op, row_ids, conn=None):
+    """Un seul événement pour tout le lot ; statistiques et lignes lues une seule fois.
+
+    Une mise à jour groupée (jusqu'à BULK_MAX_IDS lignes) ne peut donc pas
+    déborder le tampon EVENTS_CLIENT_BUFFER d'un client.
+    """
+    if not row_ids:
+        return
+    conn = conn if conn is not None else get_db()
+    payload = {'op': op, 'ids': list(row_ids), 'stats': read_stats(conn)}
+    if op != 'delete':
+        model = SYNC_MODELS[table]
+        placeholders = ', '.join('?' for _ in row_ids)
+        payload['rows'] = [
+            row.to_dict()
+            for row in model.query(conn, model.select_sql(f"WHERE id IN ({placeholders})", 'id'), tuple(row_ids))
+        ]
+    broadcaster.publish(table, payload)
+
+# ==================== MODÈLES ====================
+class Model:
+    """Ligne typée compacte : __slots__ = colonnes, sélectionnées explicitement.
+
+    Le même tuple __slots__ sert au SELECT, au constructeur et à la
+    sérialisation : impossible de décaler une colonne d'une route à l'autre.
+    """
+
+    __slots__ = ()
+    TABLE = None
+
+    def __init__(self, *values):
+        if len(values) != len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} attend {len(self.__slots__)} colonnes, {len(values)} reçues")
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def columns(cls):
+        return ', '.join(cls.__slots__)
+
+    @classmethod
+    def select_sql(cls, where='', order='', limit=False):
+        sql = f"SELECT {cls.columns()} FROM {cls.TABLE}"
+        if where:
+            sql += f" {where}"
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit:
+            sql += " LIMIT ?"
+        return sql
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        return cls(*row)
+
+    @classmethod
+    def query(cls, conn, sql, params=()):
+        cursor = conn.cursor()
+        cursor.row_factory = cls.row_factory
+        return cursor.execute(sql, params)
+
+class Appointment(Model):
+    __slots__ = ('id', 'full_name', 'email', 'phone', 'appointment_date', 'appointment_time',
+                 'treatment_type', 'message', 'status', 'created_at')
+    TABLE = 'appointments'
+
+class GalleryItem(Model):
+    __slots__ = ('id', 'title', 'description', 'before_image', 'after_image', 'category',
+                 'treatment_duration', 'visible', 'status', 'variants', 'before_hash', 'after_hash',
+                 'before_width', 'before_height', 'before_color', 'before_placeholder',
+                 'after_width', 'after_height', 'after_color', 'after_placeholder', 'created_at')
+    TABLE = 'gallery'
+
+def _legacy_appointment_dict(row):
+    # Construction historique, par index, sur un SELECT * (référence du benchmark)
+    return {
+        'id': row[0],
+        'full_name': row[1],
+        'email': row[2],
+        'phone': row[3],
+        'appointment_date': row[4],
+        'appointment_time': row[5],
+        'treatment_type': row[6],
+        'message': row[7],
+        'status': row[8],
+        'created_at': row[9]
+    }
+
+@app.cli.command('bench-rows')
+@click.option('--rows', default=20000, show_default=True, help='Nombre de RDV générés en mémoire.')
+def bench_rows_command(rows):
+    """Compare dicts construits par route et modèles __slots__ (allocations, sérialisation)."""
+    conn = sqlite3.connect(':memory:')
+    _migration_initial_schema(conn.cursor())
+    conn.executemany(
+        '''INSERT INTO appointments (full_name, email, phone, appointment_date, appointment_time, treatment_type, message)
+           VALUES (?, ?, ?, '2024-01-15', '10:00', 'invisalign', ?)''',
+        ((f'Patient {i}', f'p{i}@email.com', f'06{i:08d}', 'Message de test') for i in range(rows))
+    )
     
+    def legacy():
+        return [_legacy_appointment_dict(row) for row in conn.execute("SELECT * FROM appointments")]
+    
+    def model():
+        return Appointment.query(conn, Appointment.select_sql()).fetchall()
+    
+    print(f"{'variante':<10} {'blocs alloués':>14} {'mémoire (Ko)':>13} {'chargement (ms)':>16} {'sérialisation (ms)':>19}")
+    for name, load, serialize in (
+        ('dict', legacy, lambda items: app.json.dumps(items)),
+        ('slots', model, lambda items: app.json.dumps([item.to_dict() for item in items])),
+    ):
+        # Allocations mesurées à part : tracemalloc fausse les chronos
+        tracemalloc.start()
+        items = load()
+        stats = tracemalloc.take_snapshot().statistics('filename')
+        tracemalloc.stop()
+        del items
+        blocks = sum(stat.count for stat in stats)
+        size_kb = sum(stat.size for stat in stats) / 1024
+        
+        started = time.perf_counter()
+        items = load()
+        load_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        serialize(items)
+        dump_ms = (time.perf_counter() - started) * 1000
+        print(f"{name:<10} {blocks:>14} {size_kb:>13.0f} {load_ms:>16.1f} {dump_ms:>19.1f}")
+        del items
+    conn.close()
+
+# ==================== MIGRATIONS DB ====================
+# Chaque migration est appliquée une seule fois, dans sa propre transaction,
+# et enregistrée dans schema_version. Lancer `flask --app app migrate` au
+# déploiement : l'import du module ne touche plus au schéma.
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(f):
+        MIGRATIONS.append((version, description, f))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return f
+    return register
+
+@migration(1, 'schéma initial')
+def _migration_initial_schema(cursor):
     # Table administrateurs
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS admin_users (
@@ -95,6 +935,339 @@ def init_db():
             "INSERT INTO admin_users (username, password_hash, email) VALUES (?, ?, ?)",
             ('admin', default_password, 'admin@savassmile.com')
         )
+
+@migration(2, 'index created_at / status')
+def _migration_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_created_at ON appointments(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_status_created ON appointments(status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_gallery_created_at ON gallery(created_at)")
+
+@migration(3, 'compteurs du tableau de bord maintenus par triggers')
+def _migration_dashboard_counters(cursor):
+    # Compteurs globaux + nombre de RDV par jour : le tableau de bord lit
+    # quelques lignes au lieu de scanner appointments à chaque rafraîchissement
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS appointment_days (
+        day TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    
+    # Reprise de l'existant
+    cursor.execute("DELETE FROM counters")
+    cursor.execute("DELETE FROM appointment_days")
+    cursor.execute('''
+        INSERT INTO counters (name, value)
+        SELECT 'appointments_total', COUNT(*) FROM appointments
+        UNION ALL
+        SELECT 'appointments_pending', COUNT(*) FROM appointments WHERE status = 'pending'
+        UNION ALL
+        SELECT 'gallery_total', COUNT(*) FROM gallery
+    ''')
+    cursor.execute('''
+        INSERT INTO appointment_days (day, count)
+        SELECT date(created_at), COUNT(*) FROM appointments GROUP BY date(created_at)
+    ''')
+    
+    for statement in (
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_appointments_counters_insert
+        AFTER INSERT ON appointments
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'appointments_total';
+            UPDATE counters SET value = value + 1
+                WHERE name = 'appointments_pending' AND NEW.status = 'pending';
+            INSERT INTO appointment_days (day, count) VALUES (date(NEW.created_at), 1)
+                ON CONFLICT(day) DO UPDATE SET count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_appointments_counters_delete
+        AFTER DELETE ON appointments
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'appointments_total';
+            UPDATE counters SET value = value - 1
+                WHERE name = 'appointments_pending' AND OLD.status = 'pending';
+            UPDATE appointment_days SET count = count - 1 WHERE day = date(OLD.created_at);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_appointments_counters_status
+        AFTER UPDATE OF status ON appointments
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE counters SET value = value
+                + (NEW.status = 'pending') - (OLD.status = 'pending')
+                WHERE name = 'appointments_pending';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_gallery_counters_insert
+        AFTER INSERT ON gallery
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'gallery_total';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_gallery_counters_delete
+        AFTER DELETE ON gallery
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'gallery_total';
+        END
+        ''',
+    ):
+        cursor.execute(statement)
+
+@migration(4, 'versions de tables pour l\'invalidation du cache')
+def _migration_table_versions(cursor):
+    cursor.execute('''
+        INSERT OR IGNORE INTO counters (name, value)
+        VALUES ('version_appointments', 0), ('version_gallery', 0)
+    ''')
+    for table in ('appointments', 'gallery'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE counters SET value = value + 1 WHERE name = 'version_{table}';
+                END
+            ''')
+
+@migration(5, 'index filtre traitement')
+def _migration_treatment_index(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_treatment_created ON appointments(treatment_type, created_at)")
+
+@migration(6, 'date de dernière écriture par table (Last-Modified)')
+def _migration_table_modified(cursor):
+    cursor.execute("ALTER TABLE counters ADD COLUMN updated_at TIMESTAMP")
+    cursor.execute("UPDATE counters SET updated_at = CURRENT_TIMESTAMP WHERE name LIKE 'version_%'")
+    for table in ('appointments', 'gallery'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version_{event.lower()}")
+            cursor.execute(f'''
+                CREATE TRIGGER trg_{table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE counters SET value = value + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE name = 'version_{table}';
+                END
+            ''')
+
+@migration(7, 'journal des modifications pour la synchronisation incrémentale')
+def _migration_change_log(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log(changed_at)")
+    for table in ('appointments', 'gallery'):
+        for event, ref in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_changes_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op)
+                    VALUES ('{table}', {ref}.id, '{event.lower()}');
+                END
+            ''')
+
+@migration(8, 'index de la galerie publique (visibles, par catégorie)')
+def _migration_public_gallery_indexes(cursor):
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_gallery_visible_created "
+        "ON gallery(visible, created_at DESC, id DESC)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_gallery_visible_category_created "
+        "ON gallery(visible, category, created_at DESC, id DESC)"
+    )
+
+@migration(9, 'statut de traitement et variantes des photos de la galerie')
+def _migration_gallery_variants(cursor):
+    cursor.execute("ALTER TABLE gallery ADD COLUMN status TEXT NOT NULL DEFAULT 'ready'")
+    cursor.execute("ALTER TABLE gallery ADD COLUMN variants TEXT")
+
+@migration(10, 'stockage des photos par hash avec compteur de références')
+def _migration_image_store(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS images (
+        hash TEXT PRIMARY KEY,
+        ext TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_unreferenced ON images(refcount) WHERE refcount <= 0")
+    cursor.execute("ALTER TABLE gallery ADD COLUMN before_hash TEXT REFERENCES images(hash)")
+    cursor.execute("ALTER TABLE gallery ADD COLUMN after_hash TEXT REFERENCES images(hash)")
+    # Une référence par colonne : avant et après peuvent pointer vers le même blob
+    adjust = '''
+        UPDATE images SET refcount = refcount {sign} 1 WHERE hash = {ref}.before_hash;
+        UPDATE images SET refcount = refcount {sign} 1 WHERE hash = {ref}.after_hash;
+    '''
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_gallery_images_insert AFTER INSERT ON gallery
+        BEGIN {adjust.format(sign='+', ref='NEW')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_gallery_images_delete AFTER DELETE ON gallery
+        BEGIN {adjust.format(sign='-', ref='OLD')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_gallery_images_update
+        AFTER UPDATE OF before_hash, after_hash ON gallery
+        BEGIN
+            {adjust.format(sign='-', ref='OLD')}
+            {adjust.format(sign='+', ref='NEW')}
+        END
+    ''')
+
+@migration(11, 'dimensions, couleur dominante et aperçu des photos de la galerie')
+def _migration_gallery_image_meta(cursor):
+    for side in ('before', 'after'):
+        cursor.execute(f"ALTER TABLE gallery ADD COLUMN {side}_width INTEGER")
+        cursor.execute(f"ALTER TABLE gallery ADD COLUMN {side}_height INTEGER")
+        cursor.execute(f"ALTER TABLE gallery ADD COLUMN {side}_color TEXT")
+        cursor.execute(f"ALTER TABLE gallery ADD COLUMN {side}_placeholder TEXT")
+
+def _fts_phone(ref):
+    # Téléphone tel que saisi + chiffres seuls : "0555 12 34 56" est trouvé par "05551234"
+    digits = f"COALESCE({ref}.phone, '')"
+    for char in (' ', '-', '.', '+', '(', ')'):
+        digits = f"replace({digits}, '{char}', '')"
+    return f"COALESCE({ref}.phone, '') || ' ' || {digits}"
+
+def _fts_values(ref):
+    return f"{ref}.id, {ref}.full_name, {ref}.email, {_fts_phone(ref)}, {ref}.message"
+
+@migration(12, 'recherche plein texte des rendez-vous (FTS5)')
+def _migration_appointments_fts(cursor):
+    # Table sans contenu : le texte reste dans appointments, l'index ne stocke
+    # que les tokens ; préfixes de 2 et 3 caractères pré-indexés
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS appointments_fts USING fts5(
+            full_name, email, phone, message,
+            content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    # Classement bm25 : nom > email/téléphone > message
+    cursor.execute("INSERT INTO appointments_fts(appointments_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 5.0, 1.0)')")
+    
+    # Une table FTS sans contenu se met à jour par la commande 'delete',
+    # avec exactement les valeurs indexées à l'insertion
+    insert = f"INSERT INTO appointments_fts(rowid, full_name, email, phone, message) VALUES ({_fts_values('NEW')});"
+    delete = (
+        "INSERT INTO appointments_fts(appointments_fts, rowid, full_name, email, phone, message) "
+        f"VALUES ('delete', {_fts_values('OLD')});"
+    )
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_appointments_fts_insert AFTER INSERT ON appointments BEGIN {insert} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_appointments_fts_delete AFTER DELETE ON appointments BEGIN {delete} END")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_appointments_fts_update
+        AFTER UPDATE OF full_name, email, phone, message ON appointments
+        BEGIN {delete} {insert} END
+    ''')
+    cursor.execute(f"INSERT INTO appointments_fts(rowid, full_name, email, phone, message) "
+                   f"SELECT {_fts_values('appointments')} FROM appointments")
+
+@migration(14, 'durée des RDV et index des créneaux réservés')
+def _migration_appointment_slots(cursor):
+    cursor.execute("ALTER TABLE appointments ADD COLUMN duration INTEGER NOT NULL DEFAULT 30")
+    cursor.executemany(
+        "UPDATE appointments SET duration = ? WHERE treatment_type = ?",
+        [(minutes, treatment) for treatment, minutes in app.config['TREATMENT_DURATIONS'].items()]
+    )
+    # Partiel : un RDV annulé libère son créneau. status en dernière colonne
+    # rend l'index couvrant (SQLite relirait sinon la table pour le filtre)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_appointments_slot "
+        "ON appointments(appointment_date, appointment_time, duration, status) WHERE status != 'cancelled'"
+    )
+
+@migration(15, 'index des RDV par date pour l\'export comptable')
+def _migration_appointment_date_index(cursor):
+    # L'index des créneaux est partiel : l'export inclut aussi les annulés
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(appointment_date, appointment_time)"
+    )
+
+@migration(13, 'suivi des imports en masse (reprise, rapport de validation)')
+def _migration_import_jobs(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS import_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        target TEXT NOT NULL,
+        source TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'loading',
+        line INTEGER NOT NULL DEFAULT 0,
+        imported INTEGER NOT NULL DEFAULT 0,
+        rejected INTEGER NOT NULL DEFAULT 0,
+        errors TEXT NOT NULL DEFAULT '[]',
+        base_id INTEGER NOT NULL DEFAULT 0,
+        deferred TEXT NOT NULL DEFAULT '[]',
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    # Un seul import en cours par table : ses triggers et index sont suspendus
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_import_jobs_loading "
+        "ON import_jobs(target) WHERE state = 'loading'"
+    )
+
+def schema_version(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate_database():
+    """Applique les migrations manquantes ; renvoie la liste des versions appliquées."""
+    applied = []
+    with db_pool.connection() as conn:
+        current = schema_version(conn)
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            
+            def step(cursor, version=version, description=description, apply=apply):
+                # Relire sous verrou : un autre processus a pu migrer entre-temps
+                cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+                if cursor.fetchone():
+                    return False
+                apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+                return True
+            
+            if run_write(step, conn):
+                applied.append(version)
+    return applied
+
+# ==================== DONNÉES DE DÉMONSTRATION ====================
+def seed_demo_data(conn):
+    cursor = conn.cursor()
     
     # Données exemple
     cursor.execute("SELECT COUNT(*) FROM gallery")
@@ -128,10 +1301,33 @@ def init_db():
         ''')
     
     conn.commit()
-    conn.close()
 
-# Initialiser
-init_db()
+@app.cli.command('migrate')
+def migrate_command():
+    """Applique les migrations de schéma en attente."""
+    applied = migrate_database()
+    if applied:
+        print(f"Migrations appliquées : {', '.join(map(str, applied))}")
+    else:
+        print("Schéma déjà à jour.")
+
+@app.cli.command('seed-demo')
+def seed_demo_command():
+    """Insère les données de démonstration (développement uniquement)."""
+    migrate_database()
+    with db_pool.connection() as conn:
+        seed_demo_data(conn)
+    print("Données de démonstration insérées.")
+
+@app.cli.command('prune-changes')
+def prune_changes_command():
+    """Purge le journal des modifications au-delà de CHANGE_LOG_RETENTION_DAYS."""
+    days = app.config['CHANGE_LOG_RETENTION_DAYS']
+    with db_pool.connection() as conn:
+        deleted = run_write(lambda cursor: cursor.execute(
+            "DELETE FROM change_log WHERE changed_at < datetime('now', ?)", (f'-{days} days',)
+        ).rowcount, conn)
+    print(f"{deleted} entrées supprimées du journal.")
 
 # ==================== TEMPLATE SITE PUBLIC ====================
 HTML_TEMPLATE = '''
@@ -141,8 +1337,7 @@ HTML_TEMPLATE = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Savaş Smile | Orthodontie Invisible Expert</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&family=Playfair+Display:wght@400;500;600&display=swap" rel="stylesheet">
+    {{ font_links|safe }}
     <style>
         * {
             margin: 0;
@@ -370,6 +1565,80 @@ HTML_TEMPLATE = '''
             transform: scale(1.1);
         }
         
+        .before-after {
+            display: grid;
+            grid-template-columns: 1fr 1fr;
+            height: 100%;
+        }
+        
+        .before-after figure {
+            position: relative;
+            overflow: hidden;
+        }
+        
+        .before-after img {
+            height: 100%;
+        }
+        
+        /* Aperçu 16 px étiré et flouté par le navigateur jusqu'au chargement */
+        .blur-up {
+            background-size: cover;
+            background-position: center;
+        }
+        
+        .before-after figcaption {
+            position: absolute;
+            top: 0.75rem;
+            left: 0.75rem;
+            background: rgba(0, 0, 0, 0.6);
+            color: white;
+            padding: 0.2rem 0.7rem;
+            border-radius: 20px;
+            font-size: 0.8rem;
+        }
+        
+        .gallery-caption {
+            position: absolute;
+            bottom: 0;
+            background: rgba(0, 180, 216, 0.9);
+            color: white;
+            padding: 1rem;
+            width: 100%;
+        }
+        
+        .gallery-filters {
+            display: flex;
+            flex-wrap: wrap;
+            justify-content: center;
+            gap: 0.75rem;
+            margin-bottom: 2rem;
+        }
+        
+        .gallery-filter {
+            border: 2px solid var(--primary);
+            background: white;
+            color: var(--primary);
+            padding: 0.4rem 1.2rem;
+            border-radius: 50px;
+            cursor: pointer;
+            font-family: inherit;
+        }
+        
+        .gallery-filter.active {
+            background: var(--primary);
+            color: white;
+        }
+        
+        .gallery-more {
+            text-align: center;
+            margin-top: 2rem;
+        }
+        
+        .gallery-empty {
+            text-align: center;
+            color: #666;
+        }
+        
         /* Contact Form */
         .contact {
             padding: 5rem 2rem;
@@ -480,7 +1749,7 @@ HTML_TEMPLATE = '''
             <ul class="nav-links">
                 <li><a href="#home">Accueil</a></li>
                 <li><a href="#invisalign">Invisalign</a></li>
-                <li><a href="#team">Notre Équipe</a></li>
+                <li><a href="#gallery">Résultats</a></li>
                 <li><a href="#treatments">Traitements</a></li>
                 <li><a href="#contact">Contact</a></li>
             </ul>
@@ -502,8 +1771,8 @@ HTML_TEMPLATE = '''
                 <a href="#contact" class="cta-button" style="margin-right: 1rem;">
                     <i class="fas fa-comment-medical"></i> Consultation Gratuite
                 </a>
-                <a href="#team" class="cta-button" style="background: var(--secondary);">
-                    <i class="fas fa-user-md"></i> Rencontrer l'Équipe
+                <a href="#gallery" class="cta-button" style="background: var(--secondary);">
+                    <i class="fas fa-images"></i> Voir nos Résultats
                 </a>
             </div>
         </div>
@@ -544,32 +1813,10 @@ HTML_TEMPLATE = '''
         </div>
     </section>
 
-    <!-- Gallery -->
-    <section class="gallery" id="team">
-        <h2 class="section-title">Notre Équipe d'Experts</h2>
-        <div class="gallery-grid">
-            <div class="gallery-item">
-                <img src="https://images.unsplash.com/photo-1559839734-2b71ea197ec2?auto=format&fit=crop&w=600" alt="Orthodontiste">
-                <div style="position: absolute; bottom: 0; background: rgba(0, 180, 216, 0.9); color: white; padding: 1rem; width: 100%;">
-                    <h3>Dr. Ahmed Savaş</h3>
-                    <p>Orthodontiste spécialisé Invisalign</p>
-                </div>
-            </div>
-            <div class="gallery-item">
-                <img src="https://images.unsplash.com/photo-1612349317150-e413f6a5b16d?auto=format&fit=crop&w=600" alt="Centre Dentaire">
-                <div style="position: absolute; bottom: 0; background: rgba(0, 180, 216, 0.9); color: white; padding: 1rem; width: 100%;">
-                    <h3>Notre Centre</h3>
-                    <p>Environnement moderne et accueillant</p>
-                </div>
-            </div>
-            <div class="gallery-item">
-                <img src="https://images.unsplash.com/photo-1588776814546-1ffcf47267a5?auto=format&fit=crop&w=600" alt="Technologie">
-                <div style="position: absolute; bottom: 0; background: rgba(0, 180, 216, 0.9); color: white; padding: 1rem; width: 100%;">
-                    <h3>Technologie de Pointe</h3>
-                    <p>Scanner 3D et planification numérique</p>
-                </div>
-            </div>
-        </div>
+    <!-- Gallery : fragment rendu depuis la table gallery (voir GALLERY_FRAGMENT) -->
+    <section class="gallery" id="gallery">
+        <h2 class="section-title">Nos Résultats Avant / Après</h2>
+        {{ gallery_html|safe }}
     </section>
 
     <!-- Treatments -->
@@ -624,6 +1871,14 @@ HTML_TEMPLATE = '''
                         <option value="consultation">Première consultation</option>
                     </select>
                 </div>
+                <div class="form-group">
+                    <input type="date" name="appointment_date" required>
+                </div>
+                <div class="form-group">
+                    <select name="appointment_time" required disabled>
+                        <option value="">Choisissez un traitement et une date</option>
+                    </select>
+                </div>
                 <div class="form-group">
                     <textarea name="message" placeholder="Votre message" rows="4"></textarea>
                 </div>
@@ -688,8 +1943,36 @@ HTML_TEMPLATE = '''
                 observer.observe(el);
             });
             
+            // Créneaux libres du jour pour le traitement choisi
+            const contactForm = document.getElementById('contactForm');
+            const slotSelect = contactForm.elements.appointment_time;
+            contactForm.elements.appointment_date.min = new Date().toISOString().slice(0, 10);
+            
+            async function loadSlots() {
+                const treatment = contactForm.elements.treatment_type.value;
+                const date = contactForm.elements.appointment_date.value;
+                slotSelect.disabled = true;
+                if (!treatment || !date) {
+                    slotSelect.innerHTML = '<option value="">Choisissez un traitement et une date</option>';
+                    return;
+                }
+                const params = new URLSearchParams({ date, treatment });
+                const response = await fetch(`/api/availability?${params}`);
+                const data = await response.json();
+                if (!response.ok || !data.slots.length) {
+                    slotSelect.innerHTML = '<option value="">Aucun créneau disponible ce jour</option>';
+                    return;
+                }
+                slotSelect.innerHTML = '<option value="">Choisissez un horaire</option>'
+                    + data.slots.map(slot => `<option value="${slot}">${slot}</option>`).join('');
+                slotSelect.disabled = false;
+            }
+            
+            contactForm.elements.treatment_type.addEventListener('change', loadSlots);
+            contactForm.elements.appointment_date.addEventListener('change', loadSlots);
+            
             // Form submission
-            document.getElementById('contactForm').addEventListener('submit', function(e) {
+            contactForm.addEventListener('submit', function(e) {
                 e.preventDefault();
                 fetch(this.action, {
                     method: 'POST',
@@ -700,9 +1983,15 @@ HTML_TEMPLATE = '''
                     if (data.success) {
                         alert('Merci ! Votre demande a été envoyée. Nous vous contacterons dans les 24h.');
                         this.reset();
+                    } else if (data.pending) {
+                        // Enregistrement en cours côté serveur : pas de nouvel envoi
+                        alert(data.error);
+                        this.reset();
                     } else {
                         alert('Erreur: ' + data.error);
                     }
+                    // Le créneau choisi (ou un autre) a pu être pris entre-temps
+                    loadSlots();
                 })
                 .catch(error => {
                     alert('Erreur de connexion. Veuillez réessayer.');
@@ -726,12 +2015,99 @@ HTML_TEMPLATE = '''
                 });
             });
             
-            // Header scroll effect
-            window.addEventListener('scroll', function() {
-                const header = document.querySelector('.header');
-                if (window.scrollY > 100) {
-                    header.style.background = 'rgba(255, 255, 255, 0.98)';
-                    header.style.boxShadow = '0 5px 20px rgba(0, 0, 0, 0.1)';
+            // Galerie : filtres par catégorie et pagination via /api/gallery
+            const galleryGrid = document.getElementById('galleryGrid');
+            const galleryMore = document.getElementById('galleryMore');
+            let galleryCategory = '';
+            
+            function escapeHtml(value) {
+                const div = document.createElement('div');
+                div.textContent = value == null ? '' : value;
+                return div.innerHTML;
+            }
+            
+            // Même rendu que la macro photo() de GALLERY_FRAGMENT : srcset vers /img,
+            // dimensions intrinsèques et aperçu flouté pendant le chargement
+            const IMAGE_WIDTHS = {{ image_widths|tojson }};
+            const GALLERY_SIZES = {{ gallery_sizes|tojson }};
+            
+            function photo(item, side, label) {
+                const hash = item[side + '_hash'];
+                const width = item[side + '_width'];
+                const color = item[side + '_color'];
+                const placeholder = item[side + '_placeholder'];
+                const alt = `${label} : ${escapeHtml(item.title)}`;
+                let style = '';
+                if (color) {
+                    style = ` class="blur-up" style="background-color: ${escapeHtml(color)};`
+                        + (placeholder ? ` background-image: url(${escapeHtml(placeholder)});` : '') + '"';
+                }
+                let img;
+                if (hash && width) {
+                    const top = Math.min(width, IMAGE_WIDTHS[IMAGE_WIDTHS.length - 1]);
+                    const srcset = IMAGE_WIDTHS.filter(w => w < top).concat([top])
+                        .map(w => `/img/${hash}?w=${w} ${w}w`).join(', ');
+                    img = `<img src="/img/${hash}?w=480" srcset="${srcset}" sizes="${GALLERY_SIZES}"
+                        width="${width}" height="${item[side + '_height']}" loading="lazy" decoding="async" alt="${alt}">`;
+                } else {
+                    img = `<img src="${escapeHtml(item[side + '_image'])}" loading="lazy" decoding="async" alt="${alt}">`;
+                }
+                return `<figure${style}>${img}<figcaption>${label}</figcaption></figure>`;
+            }
+            
+            function galleryCard(item) {
+                const duration = item.treatment_duration ? ' · ' + escapeHtml(item.treatment_duration) : '';
+                const before = item.before_image ? photo(item, 'before', 'Avant') : '';
+                const after = item.after_image ? photo(item, 'after', 'Après') : '';
+                return `
+                    <div class="gallery-item" data-category="${escapeHtml(item.category)}">
+                        <div class="before-after">
+                            ${before}
+                            ${after}
+                        </div>
+                        <div class="gallery-caption">
+                            <h3>${escapeHtml(item.title)}</h3>
+                            <p>${escapeHtml(item.description)}${duration}</p>
+                        </div>
+                    </div>`;
+            }
+            
+            function loadGallery(append) {
+                const params = new URLSearchParams();
+                if (galleryCategory) params.set('category', galleryCategory);
+                if (append && galleryMore.dataset.cursor) params.set('cursor', galleryMore.dataset.cursor);
+                fetch('/api/gallery?' + params.toString())
+                .then(response => response.json())
+                .then(data => {
+                    const html = data.items.map(galleryCard).join('');
+                    if (append) {
+                        galleryGrid.insertAdjacentHTML('beforeend', html);
+                    } else {
+                        galleryGrid.innerHTML = html || '<p class="gallery-empty">Aucun cas dans cette catégorie pour le moment.</p>';
+                    }
+                    galleryMore.dataset.cursor = data.next_cursor || '';
+                    galleryMore.parentElement.style.display = data.next_cursor ? '' : 'none';
+                });
+            }
+            
+            if (galleryGrid && galleryMore) {
+                galleryMore.addEventListener('click', () => loadGallery(true));
+                document.querySelectorAll('.gallery-filter').forEach(button => {
+                    button.addEventListener('click', function() {
+                        document.querySelectorAll('.gallery-filter').forEach(b => b.classList.remove('active'));
+                        this.classList.add('active');
+                        galleryCategory = this.dataset.category;
+                        loadGallery(false);
+                    });
+                });
+            }
+            
+            // Header scroll effect
+            window.addEventListener('scroll', function() {
+                const header = document.querySelector('.header');
+                if (window.scrollY > 100) {
+                    header.style.background = 'rgba(255, 255, 255, 0.98)';
+                    header.style.boxShadow = '0 5px 20px rgba(0, 0, 0, 0.1)';
                 } else {
                     header.style.background = 'rgba(255, 255, 255, 0.95)';
                     header.style.boxShadow = '0 2px 20px rgba(0, 0, 0, 0.1)';
@@ -743,274 +2119,2548 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+# Section galerie de la page d'accueil, rendue à part (voir public_gallery)
+GALLERY_FRAGMENT = '''
+{% macro photo(item, side, label) -%}
+{%- set hash = item[side ~ '_hash'] -%}
+{%- set width = item[side ~ '_width'] -%}
+{%- set color = item[side ~ '_color'] -%}
+<figure{% if color %} class="blur-up" style="background-color: {{ color }};{% if item[side ~ '_placeholder'] %} background-image: url({{ item[side ~ '_placeholder'] }});{% endif %}"{% endif %}>
+                        <img {% if hash and width -%}
+                        {%- set top = [width, image_widths|last]|min -%}
+                        src="/img/{{ hash }}?w=480"
+                        srcset="{% for w in image_widths if w < top %}/img/{{ hash }}?w={{ w }} {{ w }}w, {% endfor %}/img/{{ hash }}?w={{ top }} {{ top }}w"
+                        sizes="{{ gallery_sizes }}"
+                        width="{{ width }}" height="{{ item[side ~ '_height'] }}"
+                        {%- else %}src="{{ item[side ~ '_image'] }}"{% endif %}
+                        loading="lazy" decoding="async" alt="{{ label }} : {{ item.title }}">
+                        <figcaption>{{ label }}</figcaption>
+                    </figure>
+{%- endmacro %}
+{% if categories|length > 1 %}
+        <div class="gallery-filters">
+            <button type="button" class="gallery-filter active" data-category="">Tous</button>
+            {% for category in categories %}
+            <button type="button" class="gallery-filter" data-category="{{ category }}">{{ category }}</button>
+            {% endfor %}
+        </div>
+{% endif %}
+        <div class="gallery-grid" id="galleryGrid">
+            {% for item in items %}
+            <div class="gallery-item" data-category="{{ item.category }}">
+                <div class="before-after">
+                    {% if item.before_image %}{{ photo(item, 'before', 'Avant') }}{% endif %}
+                    {% if item.after_image %}{{ photo(item, 'after', 'Après') }}{% endif %}
+                </div>
+                <div class="gallery-caption">
+                    <h3>{{ item.title }}</h3>
+                    <p>{{ item.description }}{% if item.treatment_duration %} · {{ item.treatment_duration }}{% endif %}</p>
+                </div>
+            </div>
+            {% else %}
+            <p class="gallery-empty">Nos cas avant / après seront bientôt disponibles.</p>
+            {% endfor %}
+        </div>
+        <div class="gallery-more"{% if not next_cursor %} style="display: none;"{% endif %}>
+            <button type="button" class="cta-button" id="galleryMore" data-cursor="{{ next_cursor or '' }}">
+                <i class="fas fa-images"></i> Voir plus de résultats
+            </button>
+        </div>
+'''
+
 # ==================== ROUTES PUBLIQUES ====================
 
+# ==================== ASSETS STATIQUES ====================
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+def minify_js(js):
+    # Minification prudente, sans analyse syntaxique : indentation, lignes
+    # vides et commentaires sur ligne entière uniquement
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+class AssetPipeline:
+    """Extrait les <style>/<script> inline d'une page vers des fichiers versionnés.
+
+    Le nom de fichier contient le hash du contenu minifié : les fichiers sont
+    immuables et servis avec un cache d'un an, seul le HTML est revalidé.
+    """
+
+    STYLE_RE = re.compile(r'<style>(.*?)</style>', re.S)
+    SCRIPT_RE = re.compile(r'<script>(.*?)</script>', re.S)
+
+    def __init__(self, folder, url_prefix='/assets'):
+        self.folder = folder
+        self.url_prefix = url_prefix
+
+    def write(self, name, ext, content):
+        data = content if isinstance(content, bytes) else content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        filename = f'{name}.{digest}.{ext}'
+        path = os.path.join(self.folder, filename)
+        if not os.path.exists(path):
+            # Écriture atomique : un worker concurrent ne lit jamais un fichier partiel
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return f'{self.url_prefix}/{filename}'
+
+    def externalize(self, name, html):
+        preloads = []
+        
+        def style(match):
+            url = self.write(name, 'css', minify_css(match.group(1)))
+            return f'<link rel="stylesheet" href="{url}">'
+        
+        def script(match):
+            url = self.write(name, 'js', minify_js(match.group(1)))
+            preloads.append(f'<link rel="preload" href="{url}" as="script">')
+            return f'<script src="{url}"></script>'
+        
+        html = self.STYLE_RE.sub(style, html)
+        html = self.SCRIPT_RE.sub(script, html)
+        if preloads:
+            html = html.replace('</head>', '    ' + '\n    '.join(preloads) + '\n</head>', 1)
+        return html
+
+asset_pipeline = AssetPipeline(app.config['ASSETS_FOLDER'])
+
+@app.route('/assets/<path:filename>')
+def asset_file(filename):
+    response = send_from_directory(
+        os.path.abspath(app.config['ASSETS_FOLDER']), filename, max_age=31536000
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# ==================== POLICES ET ICÔNES ====================
+# Sans bundle local (`flask build-fonts`), les pages retombent sur les CDN.
+FONT_AWESOME_CDN = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css'
+GOOGLE_FONTS_CDN = {
+    'home': 'https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&family=Playfair+Display:wght@400;500;600&display=swap',
+    'admin': 'https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap',
+}
+FONT_MANIFEST = os.path.join(app.config['ASSETS_FOLDER'], 'fonts-manifest.json')
+
+FONT_STYLE_NAMES = {300: 'Light', 400: 'Regular', 500: 'Medium', 600: 'SemiBold', 700: 'Bold'}
+ICON_FONTS = {
+    # préfixe de classe : (famille CSS, graisse, fichier source)
+    'fas': ('Font Awesome 6 Free', 900, 'fa-solid-900.ttf'),
+    'fab': ('Font Awesome 6 Brands', 400, 'fa-brands-400.ttf'),
+}
+ICON_PREFIX_ALIASES = {'fa-solid': 'fas', 'fa-brands': 'fab', 'fa': 'fas'}
+
+@functools.lru_cache(maxsize=1)
+def load_font_manifest():
+    try:
+        with open(FONT_MANIFEST, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def font_links(page):
+    manifest = load_font_manifest()
+    if manifest is None:
+        return (f'<link rel="stylesheet" href="{FONT_AWESOME_CDN}">\n'
+                f'    <link href="{GOOGLE_FONTS_CDN[page]}" rel="stylesheet">')
+    links = [
+        f'<link rel="preload" href="{url}" as="font" type="font/woff2" crossorigin>'
+        for url in manifest['preload']
+    ]
+    links.append(f'<link rel="stylesheet" href="{manifest["css"]}">')
+    return '\n    '.join(links)
+
+def used_icons(sources):
+    """Icônes réellement utilisées : {préfixe: {nom, ...}} à partir des classes "fas fa-xxx"."""
+    icons = {prefix: set() for prefix in ICON_FONTS}
+    for source in sources:
+        for prefix, name in re.findall(r'\b(fas|fab|fa-solid|fa-brands|fa)\s+fa-([a-z0-9-]+)', source):
+            icons[ICON_PREFIX_ALIASES.get(prefix, prefix)].add(name)
+    return icons
+
+def used_font_weights(sources):
+    """Graisses demandées aux Google Fonts et effectivement utilisées : {famille: [graisses]}."""
+    declared = {400, 700}  # texte courant et titres h1-h3 (bold par défaut)
+    for source in sources:
+        declared.update(int(w) for w in re.findall(r'font-weight:\s*(\d{3})', source))
+    families = {}
+    for url in GOOGLE_FONTS_CDN.values():
+        for family, weights in re.findall(r'family=([^:&]+):wght@([\d;]+)', url):
+            family = family.replace('+', ' ')
+            requested = {int(w) for w in weights.split(';')}
+            families.setdefault(family, set()).update(requested & declared)
+    return {family: sorted(weights) for family, weights in families.items()}
+
+def parse_icon_codepoints(css):
+    """Associe chaque nom d'icône à son point de code depuis all.css de Font Awesome."""
+    codepoints = {}
+    for selectors, code in re.findall(r'([^{}]+)\{\s*content:\s*"\\([0-9a-fA-F]+)";?\s*\}', css):
+        for name in re.findall(r'\.fa-([a-z0-9-]+)::?before', selectors):
+            codepoints[name] = int(code, 16)
+    return codepoints
+
+def subset_woff2(path, unicodes, features=None):
+    from fontTools import subset
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = features or []
+    options.name_IDs = ['*']
+    font = subset.load_font(path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+    buffer = io.BytesIO()
+    subset.save_font(font, buffer, options)
+    return buffer.getvalue()
+
+@app.cli.command('build-fonts')
+@click.option('--fa-dir', required=True, type=click.Path(exists=True, file_okay=False),
+              help="Distribution Font Awesome 6.4.0 (css/all.css et webfonts/*.ttf).")
+@click.option('--fonts-dir', required=True, type=click.Path(exists=True, file_okay=False),
+              help='Dossier des TTF statiques Google Fonts (Poppins-Regular.ttf, PlayfairDisplay-SemiBold.ttf...).')
+def build_fonts_command(fa_dir, fonts_dir):
+    """Génère des WOFF2 réduits aux icônes et graisses utilisées, plus une CSS minimale."""
+    try:
+        import fontTools  # noqa: F401
+    except ImportError:
+        raise click.ClickException("fonttools et brotli sont requis : pip install fonttools brotli")
+    
+    sources = (HTML_TEMPLATE, ADMIN_PAGE)
+    css_rules = [
+        '.fa,.fas,.fab,.fa-solid,.fa-brands{-moz-osx-font-smoothing:grayscale;'
+        '-webkit-font-smoothing:antialiased;display:inline-block;font-style:normal;'
+        'font-variant:normal;line-height:1;text-rendering:auto}',
+        '.fa-spin{animation:fa-spin 2s linear infinite}'
+        '@keyframes fa-spin{0%{transform:rotate(0)}100%{transform:rotate(360deg)}}',
+    ]
+    preload = []
+    
+    # Icônes : uniquement les glyphes référencés par les templates
+    with open(os.path.join(fa_dir, 'css', 'all.css'), encoding='utf-8') as f:
+        codepoints = parse_icon_codepoints(f.read())
+    for prefix, names in used_icons(sources).items():
+        if not names:
+            continue
+        family, weight, filename = ICON_FONTS[prefix]
+        missing = sorted(name for name in names if name not in codepoints)
+        if missing:
+            click.echo(f"Icônes inconnues ignorées : {', '.join(missing)}")
+        found = sorted(name for name in names if name in codepoints)
+        data = subset_woff2(os.path.join(fa_dir, 'webfonts', filename), [codepoints[n] for n in found])
+        url = asset_pipeline.write(filename.rsplit('.', 1)[0], 'woff2', data)
+        preload.append(url)
+        # font-display: block, bref, pour ne jamais afficher un glyphe de repli à la place d'une icône
+        css_rules.append(
+            f'@font-face{{font-family:"{family}";font-style:normal;font-weight:{weight};'
+            f'font-display:block;src:url({url}) format("woff2")}}'
+        )
+        css_rules.append(f'.{prefix},.fa-{"solid" if prefix == "fas" else "brands"}'
+                         f'{{font-family:"{family}";font-weight:{weight}}}')
+        css_rules.extend(f'.fa-{name}:before{{content:"\\{codepoints[name]:x}"}}' for name in found)
+        click.echo(f"{family} : {len(found)} icônes, {len(data)} o")
+    
+    # Texte : latin de base + Latin-1 + caractères présents dans les templates (ş, €, ...)
+    unicodes = set(range(0x20, 0x7F)) | set(range(0xA0, 0x100))
+    unicodes.update(ord(ch) for source in sources for ch in source if ord(ch) > 0x7F)
+    for family, weights in used_font_weights(sources).items():
+        for weight in weights:
+            stem = f"{family.replace(' ', '')}-{FONT_STYLE_NAMES[weight]}"
+            path = os.path.join(fonts_dir, f'{stem}.ttf')
+            if not os.path.exists(path):
+                click.echo(f"{path} introuvable, graisse {weight} ignorée")
+                continue
+            data = subset_woff2(path, sorted(unicodes), features=['kern', 'liga', 'calt'])
+            url = asset_pipeline.write(stem, 'woff2', data)
+            if (family, weight) == ('Poppins', 400):
+                preload.append(url)
+            css_rules.append(
+                f'@font-face{{font-family:"{family}";font-style:normal;font-weight:{weight};'
+                f'font-display:swap;src:url({url}) format("woff2")}}'
+            )
+            click.echo(f"{family} {weight} : {len(data)} o")
+    
+    css_url = asset_pipeline.write('fonts', 'css', '\n'.join(css_rules))
+    with open(FONT_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump({'css': css_url, 'preload': preload}, f, indent=2)
+    load_font_manifest.cache_clear()
+    click.echo(f"Manifeste écrit : {FONT_MANIFEST} ({css_url})")
+
+# ==================== PAGES PRÉ-RENDUES ====================
+class PrerenderedPage:
+    """Page HTML rendue une fois puis servie en octets immuables, pré-compressés.
+
+    Le rendu est refait seulement si le template ou son contexte change.
+    """
+
+    def __init__(self, name, template, context=None, cache_control='no-cache'):
+        self.name = name
+        self.template = template
+        self.context = context or (lambda: {})
+        self.cache_control = cache_control
+        self._lock = threading.Lock()
+        self._key = None
+        self._variants = None
+        self._etag = None
+
+    def _build(self, template, context):
+        html = render_template_string(template, **context)
+        html = asset_pipeline.externalize(self.name, html).encode('utf-8')
+        variants = {
+            'identity': html,
+            'gzip': gzip.compress(html, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            variants['br'] = brotli.compress(html, quality=11)
+        return variants, hashlib.sha256(html).hexdigest()[:32]
+
+    def variants(self):
+        template = self.template()
+        context = self.context()
+        key = (template, tuple(sorted(context.items())))
+        if self._key != key:
+            with self._lock:
+                if self._key != key:
+                    self._variants, self._etag = self._build(template, context)
+                    self._key = key
+        return self._variants, self._etag
+
+    def response(self):
+        variants, etag = self.variants()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            encoding = 'identity'
+            for candidate in ('br', 'gzip'):
+                if candidate in variants and request.accept_encodings[candidate]:
+                    encoding = candidate
+                    break
+            response = app.response_class(variants[encoding], mimetype='text/html')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = self.cache_control
+        return response
+
+class CachedFragment:
+    """Fragment HTML rendu depuis la base et gardé en mémoire jusqu'à invalidate().
+
+    Les routes d'écriture de ce processus invalident explicitement : un hit
+    ne fait aucune requête SQL. Les écritures d'un autre worker ou de la CLI
+    sont rattrapées en relisant version(conn) au plus toutes les recheck
+    secondes. La version est lue avant le rendu, qui ne peut donc pas être
+    plus ancien qu'elle.
+    """
+
+    def __init__(self, render, version, recheck):
+        self.render = render
+        self.version = version
+        self.recheck = recheck
+        self._lock = threading.Lock()
+        self._cached = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.renders = 0
+        self.invalidations = 0
+
+    def get(self):
+        cached = self._cached
+        now = time.monotonic()
+        if cached is not None and now - self._checked_at < self.recheck:
+            self.hits += 1
+            return cached[1]
+        conn = get_db()
+        version = self.version(conn)
+        if cached is not None and cached[0] == version:
+            self._checked_at = now
+            self.hits += 1
+            return cached[1]
+        with self._lock:
+            if self._cached is None or self._cached[0] != version:
+                self._cached = (version, self.render(conn))
+                self.renders += 1
+            self._checked_at = now
+            return self._cached[1]
+
+    def invalidate(self):
+        with self._lock:
+            self._cached = None
+            self.invalidations += 1
+
+    def snapshot(self):
+        return {
+            'cached': self._cached is not None,
+            'hits': self.hits,
+            'renders': self.renders,
+            'invalidations': self.invalidations,
+        }
+
+def public_gallery_page(conn, category=None, cursor=None, limit=None):
+    """Cas visibles, du plus récent au plus ancien, par clé (created_at, id)."""
+    limit = limit or app.config['PUBLIC_GALLERY_SIZE']
+    # Les photos en cours de traitement gardent leurs métadonnées EXIF : jamais publiques
+    clauses, params = ["visible = 1", "status = 'ready'"], []
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    if cursor:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    sql = GalleryItem.select_sql(f"WHERE {' AND '.join(clauses)}", 'created_at DESC, id DESC', limit=True)
+    items = GalleryItem.query(conn, sql, (*params, limit + 1)).fetchall()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
+
+def gallery_image_context():
+    # Carte publique : deux photos côte à côte, ~50vw sur mobile
+    return {
+        'image_widths': list(app.config['IMAGE_RESIZE_WIDTHS']),
+        'gallery_sizes': '(max-width: 700px) 50vw, 240px',
+    }
+
+def render_public_gallery(conn):
+    items, next_cursor = public_gallery_page(conn)
+    categories = [row[0] for row in conn.execute(
+        "SELECT DISTINCT category FROM gallery WHERE visible = 1 ORDER BY category"
+    )]
+    return render_template_string(GALLERY_FRAGMENT, items=items, categories=categories,
+                                  next_cursor=next_cursor, **gallery_image_context())
+
+# Invalidé par les routes d'écriture de la galerie : sur un hit, la page
+# d'accueil est servie sans aucune requête SQL
+public_gallery = CachedFragment(
+    render_public_gallery,
+    lambda conn: table_state(conn, 'gallery')[0],
+    recheck=app.config['PUBLIC_GALLERY_RECHECK_SECONDS'],
+)
+
+# Les templates sont lus à chaque appel : un template remplacé à chaud
+# (rechargement, tests) déclenche un nouveau rendu
+home_page = PrerenderedPage(
+    'home',
+    lambda: HTML_TEMPLATE,
+    lambda: {'font_links': font_links('home'), 'gallery_html': public_gallery.get(), **gallery_image_context()},
+    cache_control=app.config['HOME_CACHE_CONTROL'],
+)
+
 @app.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return home_page.response()
+
+def publish_late_booking(future):
+    # Réservation confirmée après la réponse au patient : l'admin la reçoit quand même
+    if future.exception() is None:
+        with db_pool.connection() as conn:
+            publish_change('appointments', 'insert', future.result(), conn)
 
 @app.route('/prendre-rdv', methods=['POST'])
 def take_appointment():
+    data = request.form
     try:
-        data = request.form
-        
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO appointments (full_name, email, phone, treatment_type, message, appointment_date, appointment_time)
-            VALUES (?, ?, ?, ?, ?, date('now'), time('now'))
-        ''', (
+        slot = requested_slot(
+            data.get('appointment_date'), data.get('appointment_time'), data.get('treatment_type')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        future = booking_writer.submit((
             data.get('full_name'),
             data.get('email'),
             data.get('phone'),
             data.get('treatment_type'),
-            data.get('message', '')
+            data.get('message', ''),
+            *slot
         ))
-        
-        conn.commit()
-        conn.close()
+        timeout = app.config['BOOKING_SUBMIT_TIMEOUT']
+        try:
+            new_id = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                # Jamais écrite : le patient peut renvoyer sa demande sans risque
+                return busy_response('Service momentanément surchargé, votre demande n\'a pas été enregistrée : veuillez réessayer.')
+            try:
+                # Déjà dans la transaction en cours : son issue arrive vite
+                new_id = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                future.add_done_callback(publish_late_booking)
+                return busy_response(
+                    'Votre demande est en cours d\'enregistrement : ne la renvoyez pas, '
+                    'nous vous confirmerons le rendez-vous.', pending=True
+                )
+        publish_change('appointments', 'insert', new_id)
         
         return jsonify({'success': True, 'message': 'Rendez-vous enregistré avec succès'})
     
+    except SlotUnavailable as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return db_error_response(e)
+
+@app.route('/api/availability')
+def availability_api():
+    """Créneaux libres d'un jour pour un traitement : ?date=AAAA-MM-JJ&treatment=..."""
+    treatment = request.args.get('treatment', '')
+    try:
+        duration = treatment_duration(treatment)
+        day = parse_day(request.args.get('date'), 'date')
+        if not day:
+            raise ValueError('Paramètre date manquant')
+        day = datetime.fromisoformat(day).date()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    def build(conn, versions):
+        return jsonify({
+            'date': day.isoformat(),
+            'treatment': treatment,
+            'duration': duration,
+            'slots': available_slots(conn, day, duration),
+        })
+    
+    # bookable_from dans la clé : le jour même, les créneaux passés disparaissent
+    return conditional_json(('appointments',), build, request.query_string, bookable_from(day), public=True)
+
+@app.route('/api/gallery')
+def public_gallery_api():
+    category = request.args.get('category') or None
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit', app.config['PUBLIC_GALLERY_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['PUBLIC_GALLERY_MAX_PAGE_SIZE']))
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+    
+    def build(conn, versions):
+        items, next_cursor = public_gallery_page(conn, category, cursor, limit)
+        public_items = []
+        for item in items:
+            data = item.to_dict()
+            del data['visible'], data['variants']
+            public_items.append(data)
+        return jsonify({'items': public_items, 'next_cursor': next_cursor})
+    
+    return conditional_json(('gallery',), build, request.query_string, public=True)
+
+# ==================== TRAITEMENT DES IMAGES ====================
+# Le contenu décide du format : l'extension et le Content-Type envoyés ne sont pas crus
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+UPLOAD_FIELDS = {'before_image': 'before_file', 'after_image': 'after_file'}
+IMAGE_META_FIELDS = ('width', 'height', 'color', 'placeholder')
+
+def sniff_image(head):
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+def image_allowed(ext):
+    allowed = app.config['ALLOWED_EXTENSIONS']
+    return ext in allowed or (ext == 'jpg' and 'jpeg' in allowed)
+
+def upload_url(path):
+    relative = os.path.relpath(path, app.config['UPLOAD_FOLDER'])
+    return f"/uploads/{relative.replace(os.sep, '/')}"
+
+class StagedUpload:
+    """Fichier reçu, haché et écrit dans uploads/tmp, pas encore dans le stockage."""
+
+    __slots__ = ('hash', 'ext', 'size', 'tmp_path')
+
+    def __init__(self, hash, ext, size, tmp_path):
+        self.hash = hash
+        self.ext = ext
+        self.size = size
+        self.tmp_path = tmp_path
+
+    def discard(self):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.tmp_path)
+
+class BlobStore:
+    """Photos adressées par leur SHA-256 : blobs/ab/cd/<hash>.<ext>, variants/ab/<hash>/.
+
+    La table images compte les références depuis gallery (triggers) ; un
+    contenu déjà stocké n'est jamais écrit deux fois. Le placement d'un blob
+    et sa suppression par le GC se font sous le verrou d'écriture SQLite :
+    ils ne peuvent pas se croiser.
+    """
+
+    def __init__(self, pool, root):
+        self.pool = pool
+        self.root = root
+        self._gc_lock = threading.Lock()
+        self.last_report = None
+        self.dedupe_hits = 0
+
+    def blob_path(self, hash, ext):
+        return os.path.join(self.root, 'blobs', hash[:2], hash[2:4], f'{hash}.{ext}')
+
+    def variants_dir(self, hash):
+        return os.path.join(self.root, 'variants', hash[:2], hash)
+
+    def stage(self, storage):
+        """Copie l'upload par blocs en calculant son hash.
+
+        Lève ValueError si le contenu n'est pas une image d'un format autorisé.
+        """
+        head = storage.stream.read(16)
+        ext = sniff_image(head)
+        if ext is None or not image_allowed(ext):
+            allowed = ', '.join(sorted(app.config['ALLOWED_EXTENSIONS']))
+            raise ValueError(f"{storage.filename or 'Fichier'} : image attendue ({allowed})")
+        
+        folder = os.path.join(self.root, 'tmp')
+        os.makedirs(folder, exist_ok=True)
+        tmp_path = os.path.join(folder, f'{secrets.token_hex(16)}.part')
+        digest = hashlib.sha256(head)
+        size = len(head)
+        with open(tmp_path, 'wb') as f:
+            f.write(head)
+            while True:
+                chunk = storage.stream.read(64 * 1024)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        return StagedUpload(digest.hexdigest(), ext, size, tmp_path)
+
+    def commit(self, cursor, staged):
+        """Dans la transaction d'écriture : enregistre le blob et place le fichier.
+
+        Idempotent (run_write peut rejouer la transaction). Le compteur de
+        références est incrémenté par le trigger de l'INSERT gallery qui suit.
+        """
+        cursor.execute('''
+            INSERT INTO images (hash, ext, size) VALUES (?, ?, ?)
+            ON CONFLICT(hash) DO NOTHING
+        ''', (staged.hash, staged.ext, staged.size))
+        path = self.blob_path(staged.hash, staged.ext)
+        if os.path.exists(path):
+            if os.path.exists(staged.tmp_path):
+                self.dedupe_hits += 1
+            staged.discard()
+        elif os.path.exists(staged.tmp_path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(staged.tmp_path, path)
+        return path
+
+    def _remove(self, path):
+        """Supprime un fichier ou un dossier ; renvoie les octets libérés."""
+        if os.path.isdir(path):
+            freed = sum(
+                os.path.getsize(os.path.join(folder, name))
+                for folder, _, names in os.walk(path) for name in names
+            )
+            shutil.rmtree(path, ignore_errors=True)
+            return freed
+        try:
+            freed = os.path.getsize(path)
+            os.remove(path)
+            return freed
+        except FileNotFoundError:
+            return 0
+
+    def _disk_entries(self):
+        """(hash, chemin) de chaque blob et dossier de variantes présents sur disque."""
+        for folder, _, names in os.walk(os.path.join(self.root, 'blobs')):
+            for name in names:
+                yield name.split('.', 1)[0], os.path.join(folder, name)
+        variants = os.path.join(self.root, 'variants')
+        for shard in (os.listdir(variants) if os.path.isdir(variants) else ()):
+            for name in os.listdir(os.path.join(variants, shard)):
+                yield name, os.path.join(variants, shard, name)
+
+    def collect(self, batch_size=100, tmp_max_age=3600):
+        """Passe de GC : blobs sans référence, fichiers orphelins, uploads abandonnés.
+
+        Travaille par petits lots, chacun dans sa propre transaction courte :
+        les lectures ne sont jamais bloquées et les écritures attendent au
+        plus un lot.
+        """
+        started = time.perf_counter()
+        report = {'blobs': 0, 'orphans': 0, 'tmp': 0, 'bytes': 0}
+        
+        with self.pool.connection() as conn:
+            # 1. Blobs dont plus aucune ligne gallery ne dépend
+            while True:
+                def sweep(cursor):
+                    rows = cursor.execute(
+                        "SELECT hash, ext FROM images WHERE refcount <= 0 LIMIT ?", (batch_size,)
+                    ).fetchall()
+                    freed = 0
+                    for hash, ext in rows:
+                        freed += self._remove(self.blob_path(hash, ext))
+                        freed += self._remove(self.variants_dir(hash))
+                        freed += image_cache.discard_prefix(os.path.join(hash[:2], hash))
+                    cursor.executemany("DELETE FROM images WHERE hash = ?", [(hash,) for hash, _ in rows])
+                    return len(rows), freed
+                
+                count, freed = run_write(sweep, conn)
+                report['blobs'] += count
+                report['bytes'] += freed
+                if count < batch_size:
+                    break
+            
+            # 2. Fichiers sans ligne images (transaction annulée, variantes
+            # produites pour un cas supprimé pendant son traitement)
+            entries = list(self._disk_entries())
+            for offset in range(0, len(entries), batch_size):
+                batch = entries[offset:offset + batch_size]
+                
+                def sweep_orphans(cursor, batch=batch):
+                    hashes = {hash for hash, _ in batch}
+                    placeholders = ', '.join('?' for _ in hashes)
+                    known = {row[0] for row in cursor.execute(
+                        f"SELECT hash FROM images WHERE hash IN ({placeholders})", tuple(hashes)
+                    )}
+                    orphans = [path for hash, path in batch if hash not in known]
+                    return len(orphans), sum(self._remove(path) for path in orphans)
+                
+                count, freed = run_write(sweep_orphans, conn)
+                report['orphans'] += count
+                report['bytes'] += freed
+        
+        # 3. Uploads interrompus restés dans tmp/
+        tmp_folder = os.path.join(self.root, 'tmp')
+        if os.path.isdir(tmp_folder):
+            deadline = time.time() - tmp_max_age
+            for name in os.listdir(tmp_folder):
+                path = os.path.join(tmp_folder, name)
+                with contextlib.suppress(FileNotFoundError):
+                    if os.path.getmtime(path) < deadline:
+                        report['bytes'] += self._remove(path)
+                        report['tmp'] += 1
+        
+        report['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        report['finished_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.last_report = report
+        return report
+
+    def collect_in_background(self):
+        """Lance une passe de GC dans un thread ; False si une passe est déjà en cours."""
+        if not self._gc_lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                self.collect()
+            except Exception as e:
+                app.logger.error("GC des images interrompu : %s", e)
+            finally:
+                self._gc_lock.release()
+        
+        threading.Thread(target=run, name='image-gc', daemon=True).start()
+        return True
+
+    def snapshot(self):
+        return {
+            'gc_running': self._gc_lock.locked(),
+            'dedupe_hits': self.dedupe_hits,
+            'last_gc': self.last_report,
+        }
+
+blob_store = BlobStore(db_pool, app.config['UPLOAD_FOLDER'])
+
+@app.cli.command('gc-images')
+def gc_images_command():
+    """Supprime les photos qui ne sont plus référencées par la galerie."""
+    report = blob_store.collect()
+    print(f"{report['blobs']} blobs et {report['orphans']} fichiers orphelins supprimés, "
+          f"{report['tmp']} uploads interrompus, {report['bytes'] / 1024:.1f} Ko libérés "
+          f"en {report['duration_ms']} ms.")
+
+def open_clean(source):
+    """Ouvre une photo orientée, en RGB(A), sans aucune métadonnée ; renvoie (image, alpha)."""
+    with Image.open(source) as original:
+        # L'orientation EXIF est appliquée aux pixels avant d'abandonner l'EXIF
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    image.info = {}
+    return image, has_alpha
+
+def dominant_color(image):
+    """Couleur la plus fréquente après réduction à 5 teintes, en #rrggbb."""
+    small = image.convert('RGB')
+    small.thumbnail((64, 64))
+    quantized = small.quantize(colors=5)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+def placeholder_uri(image, width=16):
+    """Miniature de quelques centaines d'octets en data URI, étirée puis floutée côté client."""
+    small = image.convert('RGB')
+    small.thumbnail((width, width))
+    fmt = 'webp' if pil_features.check('webp') else 'jpeg'
+    buffer = io.BytesIO()
+    small.save(buffer, fmt.upper(), quality=40)
+    return f"data:image/{fmt};base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+def render_variants(source, out_dir, widths, formats, max_width, quality):
+    """Exécuté dans un processus de travail : une photo -> variantes sans métadonnées.
+
+    Renvoie les noms de fichiers relatifs à out_dir et les métadonnées
+    d'affichage : {'src', 'width', 'height', 'color', 'placeholder',
+    'sources': {format: [[largeur, nom], ...]}}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    image, has_alpha = open_clean(source)
+    targets = sorted({w for w in widths if w < image.width} | {min(image.width, max_width)})
+    largest = None
+    sources = {}
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            if not pil_features.check(fmt):
+                continue
+            name = f'w{width}.{fmt}'
+            resized.save(os.path.join(out_dir, name), fmt.upper(), quality=quality)
+            sources.setdefault(fmt, []).append([width, name])
+        largest = (resized, width, height)
+    
+    resized, width, height = largest
+    fallback = 'full.png' if has_alpha else 'full.jpg'
+    if has_alpha:
+        resized.save(os.path.join(out_dir, fallback), 'PNG', optimize=True)
+    else:
+        resized.save(os.path.join(out_dir, fallback), 'JPEG', quality=quality, optimize=True, progressive=True)
+    return {
+        'src': fallback, 'width': width, 'height': height, 'sources': sources,
+        'color': dominant_color(image), 'placeholder': placeholder_uri(image),
+    }
+
+def render_resized(source, dest, width, fmt, quality):
+    """Exécuté dans un processus de travail : une variante à la demande pour /img."""
+    image, has_alpha = open_clean(source)
+    if fmt == 'jpeg' and has_alpha:
+        image = image.convert('RGB')
+    if width < image.width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    options = {'optimize': True} if fmt == 'png' else {'quality': quality}
+    image.save(dest, fmt.upper(), **options)
+
+def process_gallery_images(originals, widths, formats, max_width, quality):
+    """Tâche du pool : {colonne: (blob, dossier des variantes)} -> variantes par colonne.
+
+    Un contenu déjà traité (même hash, donc même dossier) n'est pas réencodé.
+    """
+    results = {}
+    for column, (source, out_dir) in originals.items():
+        manifest = os.path.join(out_dir, 'variants.json')
+        if os.path.exists(manifest):
+            with open(manifest, encoding='utf-8') as f:
+                info = json.load(f)
+        else:
+            info = render_variants(source, out_dir, widths, formats, max_width, quality)
+            with open(manifest + '.part', 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+            os.replace(manifest + '.part', manifest)
+        results[column] = (out_dir, info)
+    return results
+
+class ImagePipeline:
+    """Traitement des photos dans un pool de processus, hors du thread de requête.
+
+    La ligne gallery est créée en status 'processing' ; à la fin du
+    traitement elle passe à 'ready' (URLs des variantes) ou 'failed'.
+    """
+
+    def __init__(self, pool, workers):
+        self.pool = pool
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Jamais fork : le serveur a déjà des threads (écriture des
+                # réservations, SSE, GC, import) dont un verrou pourrait être
+                # copié pris dans l'enfant
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(method)
+                )
+            return self._executor
+
+    def execute(self, fn, *args):
+        """Exécute fn(*args) dans le pool ; renvoie un Future."""
+        return self._get_executor().submit(fn, *args)
+
+    def submit(self, item_id, blobs):
+        """blobs : {colonne: (hash, chemin du blob)}."""
+        originals = {
+            column: (path, blob_store.variants_dir(hash)) for column, (hash, path) in blobs.items()
+        }
+        future = self._get_executor().submit(
+            process_gallery_images, originals,
+            app.config['IMAGE_WIDTHS'], app.config['IMAGE_FORMATS'],
+            app.config['IMAGE_MAX_WIDTH'], app.config['IMAGE_QUALITY'],
+        )
+        self.submitted += 1
+        future.add_done_callback(functools.partial(self._finish, item_id))
+        return future
+
+    def _finish(self, item_id, future):
+        try:
+            results = future.result()
+        except Exception as e:
+            app.logger.error("Traitement des photos du cas %s impossible : %s", item_id, e)
+            self.failed += 1
+            columns = {'status': 'failed'}
+        else:
+            self.completed += 1
+            variants = {}
+            columns = {'status': 'ready'}
+            for column, (out_dir, info) in results.items():
+                info['src'] = upload_url(os.path.join(out_dir, info['src']))
+                for entries in info['sources'].values():
+                    for entry in entries:
+                        entry[1] = upload_url(os.path.join(out_dir, entry[1]))
+                variants[column] = info
+                columns[column] = info['src']
+                # Métadonnées d'affichage : before_width, before_height, ...
+                side = column.split('_', 1)[0]
+                for key in IMAGE_META_FIELDS:
+                    columns[f'{side}_{key}'] = info.get(key)
+            columns['variants'] = json.dumps(variants)
+        
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        with self.pool.connection() as conn:
+            updated = run_write(lambda cursor: cursor.execute(
+                f"UPDATE gallery SET {assignments} WHERE id = ?", (*columns.values(), item_id)
+            ).rowcount, conn)
+            if updated:
+                public_gallery.invalidate()
+                publish_change('gallery', 'update', item_id, conn)
+
+    def snapshot(self):
+        return {
+            'available': self.available,
+            'workers': self.workers,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+image_pipeline = ImagePipeline(db_pool, app.config['IMAGE_WORKERS'])
+atexit.register(image_pipeline.close)
+
+class DiskLRUCache:
+    """Fichiers dérivés sur disque, évincés du moins récemment servi au-delà de max_bytes.
+
+    L'index (nom -> taille) est en mémoire, reconstruit depuis le dossier au
+    démarrage. Le dossier est partagé entre workers : un fichier indexé a pu
+    être évincé par un autre, il est alors oublié et régénéré. Des demandes
+    concurrentes d'un même fichier absent attendent la première génération
+    (single-flight).
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self):
+        os.makedirs(self.folder, exist_ok=True)
+        found = []
+        for folder, _, names in os.walk(self.folder):
+            for name in names:
+                path = os.path.join(folder, name)
+                if name.endswith('.part'):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, os.path.relpath(path, self.folder), stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path(name))
+
+    def get_or_create(self, name, create, timeout=None):
+        """Chemin du fichier name, généré si besoin par create(chemin temporaire)."""
+        with self._lock:
+            if name in self._entries:
+                if os.path.exists(self.path(name)):
+                    self._entries.move_to_end(name)
+                    self.hits += 1
+                    return self.path(name)
+                self._forget(name)
+            future = self._inflight.get(name)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[name] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            return future.result(timeout)
+        
+        path = self.path(name)
+        partial = f'{path}.{secrets.token_hex(4)}.part'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            create(partial)
+            os.replace(partial, path)
+            size = os.path.getsize(path)
+        except BaseException as e:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(partial)
+            with self._lock:
+                self._inflight.pop(name, None)
+            future.set_exception(e)
+            raise
+        
+        with self._lock:
+            self._inflight.pop(name, None)
+            self._entries[name] = size
+            self.total_bytes += size
+            self._evict()
+        future.set_result(path)
+        return path
+
+    def _forget(self, name):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def discard(self, name):
+        """Oublie un fichier disparu du disque (évincé par un autre worker)."""
+        with self._lock:
+            self._forget(name)
+
+    def discard_prefix(self, prefix):
+        """Oublie et supprime les fichiers dont le nom commence par prefix."""
+        freed = 0
+        with self._lock:
+            for name in [name for name in self._entries if name.startswith(prefix)]:
+                size = self._entries.pop(name)
+                self.total_bytes -= size
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.path(name))
+                    freed += size
+        return freed
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+            }
+
+image_cache = DiskLRUCache(app.config['IMAGE_CACHE_FOLDER'], app.config['IMAGE_CACHE_BYTES'])
+
+IMAGE_MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+HASH_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+def image_url(hash, width):
+    return f'/img/{hash}?w={width}'
+
+def negotiate_image_format(requested):
+    """Format de sortie : celui demandé, ou le meilleur accepté par le client pour 'auto'."""
+    if requested in IMAGE_MIMETYPES and requested != 'auto':
+        candidates = (requested,)
+    else:
+        candidates = tuple(fmt for fmt in ('avif', 'webp') if request.accept_mimetypes[IMAGE_MIMETYPES[fmt]])
+    for fmt in candidates:
+        if fmt in ('jpeg', 'png') or pil_features.check(fmt):
+            return fmt
+    return 'jpeg'
+
+def send_image(path, fmt, vary_accept):
+    response = send_from_directory(
+        os.path.abspath(os.path.dirname(path)), os.path.basename(path),
+        mimetype=IMAGE_MIMETYPES[fmt], max_age=31536000
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    if vary_accept:
+        response.vary.add('Accept')
+    return response
+
+@app.route('/img/<hash>')
+def resized_image(hash):
+    """Photo de la galerie redimensionnée à la demande : /img/<hash>?w=640&fmt=auto.
+
+    La largeur est arrondie à IMAGE_RESIZE_WIDTHS (jamais d'agrandissement)
+    pour borner le nombre de variantes ; le résultat est mis en cache disque.
+    """
+    if not HASH_PATTERN.fullmatch(hash):
+        return jsonify({'success': False, 'error': 'Introuvable'}), 404
+    row = get_db().execute("SELECT ext FROM images WHERE hash = ?", (hash,)).fetchone()
+    if row is None:
+        return jsonify({'success': False, 'error': 'Introuvable'}), 404
+    source = blob_store.blob_path(hash, row[0])
+    
+    requested = request.args.get('fmt', 'auto')
+    if requested not in IMAGE_MIMETYPES and requested != 'auto':
+        return jsonify({'success': False, 'error': 'Format invalide'}), 400
+    
+    if not image_pipeline.available:
+        # Sans Pillow : original tel quel, mais jamais mis en cache partagé
+        return send_from_directory(os.path.abspath(os.path.dirname(source)), os.path.basename(source))
+    
+    widths = app.config['IMAGE_RESIZE_WIDTHS']
+    wanted = request.args.get('w', widths[-1], type=int)
+    width = next((w for w in widths if w >= wanted), widths[-1])
+    fmt = negotiate_image_format(requested)
+    name = os.path.join(hash[:2], f'{hash}-w{width}.{fmt}')
+    
+    # Largeur et format déjà produits à l'ingestion : servis sans passer par le cache
+    precomputed = os.path.join(blob_store.variants_dir(hash), f'w{width}.{fmt}')
+    if os.path.exists(precomputed):
+        return send_image(precomputed, fmt, vary_accept=requested == 'auto')
+    
+    timeout = app.config['IMAGE_RESIZE_TIMEOUT']
+    
+    def create(dest):
+        # Même borne que les requêtes qui attendent ce rendu : un encodage
+        # bloqué ne garde pas l'entrée en cours indéfiniment
+        image_pipeline.execute(
+            render_resized, source, dest, width, fmt, app.config['IMAGE_QUALITY']
+        ).result(timeout)
+    
+    for attempt in range(2):
+        try:
+            path = image_cache.get_or_create(name, create, timeout=timeout)
+            return send_image(path, fmt, vary_accept=requested == 'auto')
+        except FutureTimeoutError:
+            return busy_response('Image en cours de préparation, veuillez réessayer.', retry_after=5)
+        except NotFound:
+            # Évincé entre la recherche et l'envoi : l'oublier et régénérer une fois
+            if attempt:
+                raise
+            image_cache.discard(name)
+
+@app.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    # Les originaux (avec leur EXIF) ne sont servis que si Pillow ne peut pas
+    # produire de variantes
+    if filename.startswith('blobs/') and image_pipeline.available:
+        return jsonify({'success': False, 'error': 'Introuvable'}), 404
+    # Chemins dérivés du hash du contenu : immuables
+    response = send_from_directory(
+        os.path.abspath(app.config['UPLOAD_FOLDER']), filename, max_age=31536000
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    limit = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return jsonify({'success': False, 'error': f'Fichier trop volumineux (max {limit} Mo)'}), 413
+
+# ==================== ROUTES ADMIN (API) ====================
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/login', methods=['POST'])
+def admin_login():
+    data = request.json
+    username = data.get('username')
+    password = data.get('password')
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT password_hash FROM admin_users WHERE username = ?", (username,))
+    user = cursor.fetchone()
+    
+    if user and verify_password(user[0], password):
+        session['admin_logged_in'] = True
+        session['username'] = username
+        return jsonify({'success': True})
+    
+    return jsonify({'success': False, 'error': 'Identifiants incorrects'})
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/logout', methods=['POST'])
+def admin_logout():
+    session.clear()
+    return jsonify({'success': True})
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/dashboard')
+@admin_required
+def admin_dashboard():
+    # La date fait partie de la clé : le compteur "aujourd'hui" change à minuit
+    today = datetime.now(timezone.utc).date().isoformat()
+    
+    def build(conn, versions):
+        key = ('dashboard', today, *versions)
+        body = response_cache.get_or_compute(key, lambda: json_bytes(build_dashboard_payload(conn)))
+        return app.response_class(body, mimetype='application/json')
+    
+    return conditional_json(('appointments', 'gallery'), build, today)
+
+def read_stats(conn):
+    """Bloc statistiques : compteurs maintenus par triggers, lecture en temps constant."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, value FROM counters")
+    counters = dict(cursor.fetchall())
+    
+    cursor.execute("SELECT count FROM appointment_days WHERE day = date('now')")
+    row = cursor.fetchone()
+    
+    return {
+        'total_appointments': counters.get('appointments_total', 0),
+        'today_appointments': row[0] if row else 0,
+        'pending_appointments': counters.get('appointments_pending', 0),
+        'total_cases': counters.get('gallery_total', 0)
+    }
+
+def build_dashboard_payload(conn):
+    cursor = conn.cursor()
+    
+    # Rendez-vous récents
+    appointments_list = [
+        appointment.to_dict() for appointment in Appointment.query(
+            conn, Appointment.select_sql(order='created_at DESC', limit=True), (10,)
+        )
+    ]
+    
+    # Galerie
+    gallery_list = [
+        item.to_dict() for item in GalleryItem.query(
+            conn, GalleryItem.select_sql(order='created_at DESC', limit=True), (6,)
+        )
+    ]
+    
+    # Données pour graphiques
+    cursor.execute('''
+        SELECT 
+            substr(day, 1, 7) as month,
+            SUM(count) as count
+        FROM appointment_days 
+        WHERE day >= date('now', '-6 months')
+        GROUP BY substr(day, 1, 7)
+        ORDER BY month
+    ''')
+    appointments_by_month = cursor.fetchall()
+    
+    return {
+        'stats': read_stats(conn),
+        'cursor': latest_change(conn),
+        'appointments': appointments_list,
+        'gallery': gallery_list,
+        'charts': {
+            'appointments_by_month': [
+                {'month': row[0], 'count': row[1]} for row in appointments_by_month
+            ]
+        }
+    }
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+def stream_rows(model, sql, params, fmt):
+    """Réponse streamée : le curseur est lu par morceaux et sérialisé au fil de l'eau.
+
+    La connexion est prise dans le pool par le générateur lui-même et rendue
+    quand le flux se termine ou que le client se déconnecte.
+    """
+    fetch_size = app.config['STREAM_FETCH_SIZE']
+    dumps = app.json.dumps
+    
+    def generate():
+        with db_pool.connection() as conn:
+            cursor = model.query(conn, sql, params)
+            try:
+                if fmt == 'json':
+                    yield '['
+                separator = ''
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    if fmt == 'ndjson':
+                        yield ''.join(dumps(row.to_dict()) + '\n' for row in rows)
+                    else:
+                        yield separator + ','.join(dumps(row.to_dict()) for row in rows)
+                        separator = ','
+                if fmt == 'json':
+                    yield ']'
+            finally:
+                cursor.close()
+    
+    return app.response_class(generate(), mimetype=STREAM_FORMATS[fmt])
+
+def encode_cursor(created_at, row_id):
+    raw = f'{created_at}|{row_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return created_at, int(row_id)
+    except (ValueError, UnicodeError):
+        raise ValueError('Curseur invalide')
+
+def parse_day(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        raise ValueError(f'Paramètre {name} invalide (format AAAA-MM-JJ)')
+
+def appointment_filters(args, date_column='created_at'):
+    """Clauses WHERE communes aux listes de RDV (statut, traitement, période).
+
+    La période porte sur date_column : date de la demande (created_at) pour
+    la liste, date du rendez-vous (appointment_date) pour l'export comptable.
+    """
+    clauses, params = [], []
+    if args.get('status'):
+        clauses.append("status = ?")
+        params.append(args['status'])
+    if args.get('treatment'):
+        clauses.append("treatment_type = ?")
+        params.append(args['treatment'])
+    start = parse_day(args.get('from'), 'from')
+    if start:
+        clauses.append(f"{date_column} >= ?")
+        params.append(start)
+    end = parse_day(args.get('to'), 'to')
+    if end:
+        # Borne inclusive : tout le jour "to"
+        clauses.append(f"{date_column} < date(?, '+1 day')")
+        params.append(end)
+    return clauses, params
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/appointments')
+@admin_required
+def get_appointments():
+    try:
+        clauses, params = appointment_filters(request.args)
+        limit = request.args.get('limit', app.config['APPOINTMENTS_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, app.config['APPOINTMENTS_MAX_PAGE_SIZE']))
+        if request.args.get('cursor'):
+            # Pagination par clé (created_at, id) : coût constant quelle que soit la page
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(decode_cursor(request.args['cursor']))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    sql = Appointment.select_sql(where, 'created_at DESC, id DESC')
+    
+    def build(conn, versions):
+        # ?stream=json|ndjson : export complet sans pagination, mémoire constante
+        fmt = request.args.get('stream')
+        if fmt in STREAM_FORMATS:
+            return stream_rows(Appointment, sql, params, fmt)
+        
+        appointments = Appointment.query(conn, f"{sql} LIMIT ?", (*params, limit + 1)).fetchall()
+        
+        next_cursor = None
+        if len(appointments) > limit:
+            appointments = appointments[:limit]
+            next_cursor = encode_cursor(appointments[-1].created_at, appointments[-1].id)
+        
+        appointments_list = [appointment.to_dict() for appointment in appointments]
+        
+        return jsonify({'items': appointments_list, 'next_cursor': next_cursor})
+    
+    return conditional_json(('appointments',), build, request.query_string)
+
+def fts_query(text):
+    """Saisie libre -> requête FTS5 : chaque mot devient un préfixe, tous requis."""
+    tokens = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/appointments/search')
+@admin_required
+def search_appointments():
+    """Recherche par nom, email, téléphone ou message, classée par pertinence.
+
+    Seules les SEARCH_MAX_CANDIDATES correspondances les plus récentes sont
+    classées (parcours de l'index par rowid décroissant) : une recherche
+    très large comme "ka" reste en millisecondes ; truncated=true signale
+    que des correspondances plus anciennes n'ont été ni classées ni
+    filtrées. Pagination par clé (rang bm25, id) ; accepte aussi les
+    filtres de la liste.
+    """
+    query = fts_query(request.args.get('q', ''))
+    if not query:
+        return jsonify({'success': False, 'error': 'Recherche vide'}), 400
+    try:
+        clauses, params = appointment_filters(request.args)
+        limit = request.args.get('limit', app.config['APPOINTMENTS_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, app.config['APPOINTMENTS_MAX_PAGE_SIZE']))
+        if request.args.get('cursor'):
+            rank, row_id = decode_cursor(request.args['cursor'])
+            clauses.append("(hits.rank, id) > (?, ?)")
+            params.extend((float(rank), row_id))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    sql = f'''
+        SELECT {Appointment.columns()}, hits.rank
+        FROM (
+            SELECT rowid, rank FROM appointments_fts WHERE appointments_fts MATCH ?
+            ORDER BY rowid DESC LIMIT ?
+        ) AS hits
+        JOIN appointments ON appointments.id = hits.rowid
+        {where}
+        ORDER BY hits.rank, id
+        LIMIT ?
+    '''
+    
+    def build(conn, versions):
+        candidates = app.config['SEARCH_MAX_CANDIDATES']
+        rows = conn.execute(sql, (query, candidates, *params, limit + 1)).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(repr(rows[-1][-1]), rows[-1][0])
+        items = [Appointment(*row[:-1]).to_dict() for row in rows]
+        truncated = conn.execute(
+            "SELECT 1 FROM appointments_fts WHERE appointments_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (query, candidates)
+        ).fetchone() is not None
+        return jsonify({'items': items, 'next_cursor': next_cursor, 'truncated': truncated})
+    
+    return conditional_json(('appointments',), build, request.query_string)
+
+# ==================== EXPORTS ====================
+EXPORT_COLUMNS = (
+    ('id', 'N°'),
+    ('full_name', 'Patient'),
+    ('email', 'Email'),
+    ('phone', 'Téléphone'),
+    ('appointment_date', 'Date RDV'),
+    ('appointment_time', 'Heure RDV'),
+    ('treatment_type', 'Traitement'),
+    ('message', 'Message'),
+    ('status', 'Statut'),
+    ('created_at', 'Créé le'),
+)
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def csv_safe(value):
+    # Une cellule commençant par = + - @ serait évaluée comme formule par Excel
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+def csv_chunks(batches):
+    """CSV pour Excel en français : BOM UTF-8, séparateur point-virgule."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    writer.writerow([label for _, label in EXPORT_COLUMNS])
+    yield '\ufeff' + buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([csv_safe(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+
+class _ChunkSink(io.RawIOBase):
+    """Flux non positionnable qui accumule ce que zipfile écrit, vidé à chaque morceau."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Rendez-vous" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+def xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c><v>{value}</v></c>')
+        elif value is not None:
+            text = xml_escape(XML_INVALID_CHARS.sub('', str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+        else:
+            cells.append('<c/>')
+    return f"<row>{''.join(cells)}</row>"
+
+def xlsx_chunks(batches):
+    """Classeur XLSX minimal écrit au fil de l'eau (zip sans retour arrière, chaînes en ligne).
+
+    Aucune dépendance : la feuille est produite ligne à ligne dans l'entrée
+    zip, chaque morceau compressé est envoyé dès qu'il est prêt.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield sink.drain()
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(xlsx_row([label for _, label in EXPORT_COLUMNS]).encode('utf-8'))
+            for rows in batches:
+                sheet.write(''.join(xlsx_row(row) for row in rows).encode('utf-8'))
+                yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', csv_chunks),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', xlsx_chunks),
+}
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 : en-tête et pied gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/appointments/export')
+@admin_required
+def export_appointments():
+    """Export comptable : /export?format=csv|xlsx&from=AAAA-MM-JJ&to=AAAA-MM-JJ.
+
+    La période porte sur la date du rendez-vous (les RDV tenus dans le
+    mois), pas sur la date de la demande comme la liste. Lignes lues depuis un seul curseur par morceaux de STREAM_FETCH_SIZE et
+    envoyées au fur et à mesure : la mémoire reste constante quelle que soit
+    la période. Le CSV est compressé en gzip si le client l'accepte.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f'Format invalide : {fmt}'}), 400
+    try:
+        clauses, params = appointment_filters(request.args, 'appointment_date')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    columns = ', '.join(column for column, _ in EXPORT_COLUMNS)
+    sql = f"SELECT {columns} FROM appointments {where} ORDER BY appointment_date, appointment_time, id"
+    fetch_size = app.config['STREAM_FETCH_SIZE']
+    
+    def batches():
+        with db_pool.connection() as conn:
+            cursor = conn.execute(sql, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cursor.close()
+    
+    mimetype, render = EXPORT_FORMATS[fmt]
+    body = render(batches())
+    compress = fmt == 'csv' and request.accept_encodings['gzip']
+    if compress:
+        body = gzip_stream(body)
+    
+    response = app.response_class(body, mimetype=mimetype)
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    period = '_'.join(filter(None, (request.args.get('from'), request.args.get('to')))) or 'tout'
+    response.headers['Content-Disposition'] = f'attachment; filename="rendez-vous_{period}.{fmt}"'
+    response.cache_control.no_store = True
+    return response
+
+# ==================== IMPORT EN MASSE ====================
+class ImportInProgress(Exception):
+    pass
+
+APPOINTMENT_STATUSES = ('pending', 'confirmed', 'cancelled')
+IMPORT_FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+# En-têtes acceptés : noms de colonnes ou libellés de l'export (aller-retour possible)
+IMPORT_ALIASES = {label.lower(): column for column, label in EXPORT_COLUMNS}
+
+def import_format(filename):
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return IMPORT_FORMATS.get(os.path.splitext(name)[1])
+
+def file_fingerprint(path):
+    """Taille + hash du premier Mio : reconnaît un fichier relancé sans le relire en entier."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read(1024 * 1024))
+    return f'{os.path.getsize(path)}-{digest.hexdigest()[:32]}'
+
+def open_import(path):
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(path, 'rt', encoding='utf-8-sig', newline='')
+    return open(path, 'r', encoding='utf-8-sig', newline='')
+
+def read_records(stream, fmt):
+    """(numéro de ligne, dict de champs) ; None pour une ligne NDJSON illisible."""
+    if fmt == 'ndjson':
+        for line, text in enumerate(stream, 1):
+            if not text.strip():
+                continue
+            try:
+                yield line, json.loads(text)
+            except ValueError:
+                yield line, None
+        return
+    
+    header = stream.readline()
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    names = next(csv.reader([header], delimiter=delimiter), [])
+    fields = [IMPORT_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in names]
+    reader = csv.reader(stream, delimiter=delimiter)
+    for values in reader:
+        if values:
+            # +1 : l'en-tête a été lu hors du reader
+            yield reader.line_num + 1, dict(zip(fields, values))
+
+ISO_DAY = re.compile(r'\d{4}-\d{2}-\d{2}')
+ISO_TIME = re.compile(r'(?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d)?')
+
+# strptime coûte ~10 µs par appel : expressions régulières et fromisoformat
+# gardent la validation sous la seconde pour 100 000 lignes
+def _text(record, field, required=False, default=''):
+    value = record.get(field)
+    value = str(value).strip() if value is not None else ''
+    if value[:1] == "'" and value[1:2] in ('=', '+', '-', '@'):
+        value = value[1:]  # échappement ajouté par csv_safe
+    if required and not value:
+        raise ValueError(f'{field} manquant')
+    return value or default
+
+def _day(value, field):
+    try:
+        if ISO_DAY.fullmatch(value):
+            datetime.fromisoformat(value)
+            return value
+    except ValueError:
+        pass
+    raise ValueError(f'{field} invalide (format AAAA-MM-JJ) : {value}')
+
+def _timestamp(value, field):
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{field} invalide : {value}')
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat(' ', 'seconds')
+
+def validate_appointment(record):
+    if not isinstance(record, dict):
+        raise ValueError('ligne illisible')
+    email = _text(record, 'email', required=True)
+    if '@' not in email:
+        raise ValueError(f'email invalide : {email}')
+    day = _day(_text(record, 'appointment_date', required=True), 'appointment_date')
+    slot = _text(record, 'appointment_time', required=True)
+    if not ISO_TIME.fullmatch(slot):
+        raise ValueError(f'appointment_time invalide (format HH:MM) : {slot}')
+    slot = slot[:5]
+    status = _text(record, 'status', default='pending')
+    if status not in APPOINTMENT_STATUSES:
+        raise ValueError(f'status invalide : {status}')
+    treatment = _text(record, 'treatment_type', required=True)
+    duration = _text(record, 'duration') or app.config['TREATMENT_DURATIONS'].get(treatment, 30)
+    try:
+        duration = int(duration)
+    except ValueError:
+        duration = 0
+    if not 0 < duration <= longest_treatment():
+        raise ValueError(
+            f"duration invalide (1 à {longest_treatment()} minutes) : {_text(record, 'duration')}"
+        )
+    created_at = _text(record, 'created_at')
+    return (
+        _text(record, 'full_name', required=True),
+        email,
+        _text(record, 'phone', required=True),
+        day,
+        slot,
+        treatment,
+        _text(record, 'message'),
+        status,
+        _timestamp(created_at, 'created_at') if created_at else f'{day} {slot}:00',
+        duration,
+    )
+
+def validate_gallery_item(record):
+    if not isinstance(record, dict):
+        raise ValueError('ligne illisible')
+    visible = _text(record, 'visible', default='1').lower()
+    if visible not in ('0', '1', 'true', 'false'):
+        raise ValueError(f'visible invalide : {visible}')
+    created_at = _text(record, 'created_at')
+    return (
+        _text(record, 'title', required=True),
+        _text(record, 'description'),
+        _text(record, 'before_image'),
+        _text(record, 'after_image'),
+        _text(record, 'category', default='Invisalign'),
+        _text(record, 'treatment_duration'),
+        int(visible in ('1', 'true')),
+        _timestamp(created_at, 'created_at') if created_at
+        else datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+    )
+
+def reindex_appointments(cursor, first_id, last_id):
+    cursor.execute(
+        "INSERT INTO appointments_fts(rowid, full_name, email, phone, message) "
+        f"SELECT {_fts_values('appointments')} FROM appointments WHERE id > ? AND id <= ?",
+        (first_id, last_id)
+    )
+
+def recount_appointments(cursor):
+    # Compteurs recalculés sur toute la table, comme à leur création
+    cursor.execute("UPDATE counters SET value = (SELECT COUNT(*) FROM appointments) WHERE name = 'appointments_total'")
+    cursor.execute('''
+        UPDATE counters SET value = (SELECT COUNT(*) FROM appointments WHERE status = 'pending')
+        WHERE name = 'appointments_pending'
+    ''')
+    cursor.execute("DELETE FROM appointment_days")
+    cursor.execute('''
+        INSERT INTO appointment_days (day, count)
+        SELECT date(created_at), COUNT(*) FROM appointments GROUP BY date(created_at)
+    ''')
+
+def recount_gallery(cursor):
+    cursor.execute("UPDATE counters SET value = (SELECT COUNT(*) FROM gallery) WHERE name = 'gallery_total'")
+    cursor.execute('''
+        UPDATE images SET refcount =
+            (SELECT COUNT(*) FROM gallery WHERE before_hash = images.hash)
+            + (SELECT COUNT(*) FROM gallery WHERE after_hash = images.hash)
+    ''')
+
+# Cible : (INSERT, validation d'une ligne, index dérivé par tranche d'ids, recalcul global)
+IMPORT_TARGETS = {
+    'appointments': (
+        '''INSERT INTO appointments (full_name, email, phone, appointment_date, appointment_time,
+                                       treatment_type, message, status, created_at, duration)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+        validate_appointment,
+        reindex_appointments,
+        recount_appointments,
+    ),
+    'gallery': (
+        '''INSERT INTO gallery (title, description, before_image, after_image, category,
+                                  treatment_duration, visible, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+        validate_gallery_item,
+        None,
+        recount_gallery,
+    ),
+}
+
+class ImportReport:
+    """Progression et rapport de validation d'un import (erreurs détaillées plafonnées)."""
+
+    def __init__(self, job_id=None, line=0, imported=0, rejected=0, errors=(), max_errors=100):
+        self.job_id = job_id
+        self.line = line
+        self.imported = imported
+        self.rejected = rejected
+        self.errors = list(errors)
+        self.max_errors = max_errors
+        self.state = 'loading'
+
+    def reject(self, line, error):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'error': str(error)})
+
+    def to_dict(self):
+        return {
+            'job': self.job_id,
+            'state': self.state,
+            'line': self.line,
+            'imported': self.imported,
+            'rejected': self.rejected,
+            'errors': self.errors,
+        }
+
+# Gardés pendant un import de la galerie : une photo envoyée en parallèle doit
+# rester référencée, sinon une passe de GC supprimerait son blob
+IMPORT_KEPT_TRIGGERS = ('trg_gallery_images_insert', 'trg_gallery_images_delete', 'trg_gallery_images_update')
+
+def schema_object_exists(cursor, kind, name):
+    return cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (kind, name)
+    ).fetchone() is not None
+
+class BulkImporter:
+    """Import CSV/NDJSON par transactions de IMPORT_CHUNK_ROWS lignes (executemany).
+
+    Le temps du chargement, les triggers (compteurs, versions, journal,
+    plein texte) et les index secondaires de la table cible sont supprimés ;
+    leur SQL est conservé dans import_jobs. Seuls les compteurs de
+    références d'images restent actifs (IMPORT_KEPT_TRIGGERS). La fin
+    de l'import les recrée et reconstruit en une fois ce qu'ils auraient
+    maintenu ligne à ligne. Chaque transaction enregistre aussi la dernière
+    ligne lue : relancer le même fichier reprend là où l'import s'est arrêté.
+    Un échec remet aussitôt triggers et index (état "paused") : seules les
+    données restent à reprendre, le site n'attend pas un import-abort.
+    """
+
+    def __init__(self, pool, chunk_rows=50000, max_errors=100):
+        self.pool = pool
+        self.chunk_rows = chunk_rows
+        self.max_errors = max_errors
+        self._lock = threading.Lock()
+        self.current = None
+        self.last_report = None
+
+    def _claim(self, conn, target, source, fingerprint):
+        def claim(cursor):
+            cursor.execute(
+                "SELECT id, fingerprint, line, imported, rejected, errors, state, deferred FROM import_jobs "
+                "WHERE target = ? AND state IN ('loading', 'paused')", (target,)
+            )
+            job = cursor.fetchone()
+            if job:
+                if job[1] != fingerprint:
+                    raise ImportInProgress(
+                        f"Import n°{job[0]} inachevé sur {target} : relancez-le avec le même "
+                        f"fichier ou abandonnez-le (flask import-abort {job[0]})"
+                    )
+                if job[6] == 'paused':
+                    # Triggers remis lors de l'échec : les suspendre à nouveau. Tout ce
+                    # qui précède est déjà indexé (reconstruction ou triggers)
+                    for kind, name, _ in json.loads(job[7]):
+                        if name not in IMPORT_KEPT_TRIGGERS and schema_object_exists(cursor, kind, name):
+                            cursor.execute(f"DROP {kind.upper()} {name}")
+                    cursor.execute(f'''
+                        UPDATE import_jobs SET state = 'loading', updated_at = CURRENT_TIMESTAMP,
+                                               base_id = (SELECT COALESCE(MAX(id), 0) FROM {target})
+                        WHERE id = ?
+                    ''', (job[0],))
+                return ImportReport(job[0], job[2], job[3], job[4], json.loads(job[5]), self.max_errors)
+            
+            deferred = cursor.execute('''
+                SELECT type, name, sql FROM sqlite_master
+                WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+                ORDER BY type, name
+            ''', (target,)).fetchall()
+            deferred = [obj for obj in deferred if obj[1] not in IMPORT_KEPT_TRIGGERS]
+            for kind, name, _ in deferred:
+                cursor.execute(f"DROP {kind.upper()} {name}")
+            base_id = cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {target}").fetchone()[0]
+            cursor.execute(
+                "INSERT INTO import_jobs (target, source, fingerprint, base_id, deferred) VALUES (?, ?, ?, ?, ?)",
+                (target, source, fingerprint, base_id, json.dumps(deferred))
+            )
+            return ImportReport(cursor.lastrowid, max_errors=self.max_errors)
+        return run_write(claim, conn)
+
+    def _load(self, conn, insert_sql, rows, job_id, progress):
+        """Insère un lot ; progress (line, imported, rejected, errors) est enregistré dans la même transaction."""
+        def load(cursor):
+            if rows:
+                cursor.executemany(insert_sql, rows)
+            cursor.execute('''
+                UPDATE import_jobs SET line = ?, imported = ?, rejected = ?, errors = ?,
+                                       updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (*progress, job_id))
+        run_write(load, conn)
+
+    def _finish(self, conn, job_id, state):
+        """Recrée index et triggers, reconstruit l'état dérivé et force la resynchronisation.
+
+        Index et plein texte sont reconstruits en transactions courtes (base_id
+        avance avec chaque tranche) pour ne pas bloquer les réservations ; seule
+        la dernière transaction recalcule les compteurs et remet les triggers.
+        """
+        row = conn.execute(
+            "SELECT target, base_id, deferred FROM import_jobs WHERE id = ? AND state = 'loading'", (job_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f'Aucun import en cours n°{job_id}')
+        target, base_id, deferred = row
+        deferred = json.loads(deferred)
+        _, _, reindex, recount = IMPORT_TARGETS[target]
+        
+        def create_index(cursor, name, sql):
+            # Déjà recréé si une reprise suit une fin d'import interrompue
+            if not schema_object_exists(cursor, 'index', name):
+                cursor.execute(sql)
+        
+        for kind, name, sql in deferred:
+            if kind == 'index':
+                run_write(lambda cursor: create_index(cursor, name, sql), conn)
+        
+        def reindex_chunk(cursor, first_id):
+            last_id = cursor.execute(
+                f"SELECT MAX(id) FROM (SELECT id FROM {target} WHERE id > ? ORDER BY id LIMIT ?)",
+                (first_id, self.chunk_rows)
+            ).fetchone()[0]
+            if last_id is not None:
+                reindex(cursor, first_id, last_id)
+                cursor.execute("UPDATE import_jobs SET base_id = ? WHERE id = ?", (last_id, job_id))
+            return last_id
+        
+        while reindex:
+            last_id = run_write(lambda cursor: reindex_chunk(cursor, base_id), conn)
+            if last_id is None:
+                break
+            base_id = last_id
+        
+        def finish(cursor):
+            if reindex:
+                # Lignes écrites par le site pendant les tranches précédentes
+                reindex_chunk(cursor, base_id)
+            recount(cursor)
+            cursor.execute(
+                "UPDATE counters SET value = value + 1, updated_at = CURRENT_TIMESTAMP WHERE name = ?",
+                (f'version_{target}',)
+            )
+            # Journal vidé et numérotation sautée : tout curseur de /changes
+            # antérieur déclenche un rechargement complet (reset)
+            latest = cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+            cursor.execute("DELETE FROM change_log")
+            cursor.execute(
+                "INSERT INTO change_log (seq, table_name, row_id, op) VALUES (?, ?, ?, 'import')",
+                (latest + 2, target, job_id)
+            )
+            for kind, name, sql in deferred:
+                if kind == 'trigger' and not schema_object_exists(cursor, 'trigger', name):
+                    cursor.execute(sql)
+            cursor.execute(
+                "UPDATE import_jobs SET state = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (state, job_id)
+            )
+        
+        run_write(finish, conn)
+        if target == 'gallery':
+            public_gallery.invalidate()
+        broadcaster.publish('resync', {})
+
+    def _pause(self, conn, job_id):
+        """Après un échec : index, triggers et état dérivé rétablis, le job reste reprenable."""
+        try:
+            self._finish(conn, job_id, 'paused')
+            return True
+        except Exception as e:
+            app.logger.error(
+                "Import n°%s : triggers non restaurés (%s), lancer flask import-abort %s", job_id, e, job_id
+            )
+            return False
+
+    def run(self, path, target, fmt=None, dry_run=False, source=None, progress=None):
+        """Importe le fichier ; dry_run valide seulement. Renvoie le rapport."""
+        with self._lock:
+            return self._run(path, target, fmt, dry_run, source, progress)
+
+    def _run(self, path, target, fmt, dry_run, source, progress):
+        # Appelé verrou pris
+        insert_sql, validate, _, _ = IMPORT_TARGETS[target]
+        fmt = fmt or import_format(source or path)
+        if fmt not in ('csv', 'ndjson'):
+            raise ValueError('Format non reconnu (csv, ndjson ou jsonl, éventuellement .gz)')
+        
+        with self.pool.connection() as conn:
+            self.last_report = None
+            if dry_run:
+                report = ImportReport(max_errors=self.max_errors)
+            else:
+                report = self._claim(conn, target, source or path, file_fingerprint(path))
+            self.current = report
+            skip = report.line
+            
+            def loaded(line, count):
+                report.imported += count
+                report.line = line
+                if progress:
+                    progress(report)
+            
+            try:
+                # Un lot s'écrit (SQLite rend le GIL) pendant que le suivant est lu et validé
+                with open_import(path) as stream, ThreadPoolExecutor(1, 'bulk-import') as writer:
+                    records = read_records(stream, fmt)
+                    pending = None
+                    while True:
+                        chunk = list(itertools.islice(records, self.chunk_rows))
+                        if not chunk:
+                            break
+                        line = chunk[-1][0]
+                        if line <= skip:
+                            continue  # reprise : lignes déjà importées
+                        rows = []
+                        for record_line, record in chunk:
+                            if record_line <= skip:
+                                continue
+                            try:
+                                rows.append(validate(record))
+                            except ValueError as e:
+                                report.reject(record_line, e)
+                        if pending:
+                            pending[0].result()
+                            loaded(*pending[1:])
+                            pending = None
+                        if dry_run:
+                            loaded(line, len(rows))
+                            continue
+                        state = (line, report.imported + len(rows), report.rejected, json.dumps(report.errors))
+                        pending = (writer.submit(self._load, conn, insert_sql, rows, report.job_id, state), line, len(rows))
+                    if pending:
+                        pending[0].result()
+                        loaded(*pending[1:])
+                if not dry_run:
+                    self._finish(conn, report.job_id, 'done')
+                report.state = 'validated' if dry_run else 'done'
+            except Exception:
+                report.state = 'failed'
+                if report.job_id is not None and self._pause(conn, report.job_id):
+                    report.state = 'paused'
+                raise
+            finally:
+                self.current = None
+                self.last_report = report.to_dict()
+        return report
+
+    def abort(self, job_id):
+        """Clôt un import inachevé : les lignes déjà chargées restent, index et triggers reviennent."""
+        with self._lock, self.pool.connection() as conn:
+            row = conn.execute("SELECT state FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row and row[0] == 'paused':
+                # Déjà restauré lors de l'échec
+                run_write(lambda cursor: cursor.execute(
+                    "UPDATE import_jobs SET state = 'aborted', updated_at = CURRENT_TIMESTAMP WHERE id = ?", (job_id,)
+                ), conn)
+            else:
+                self._finish(conn, job_id, 'aborted')
+
+    def run_in_background(self, path, target, fmt=None, dry_run=False, source=None):
+        """Lance l'import dans un thread ; le fichier est supprimé à la fin.
+
+        Le verrou est pris ici, sans attendre, puis confié au thread : deux
+        envois simultanés ne peuvent pas être acceptés tous les deux.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                self._run(path, target, fmt, dry_run, source, None)
+            except Exception as e:
+                app.logger.error("Import %s interrompu : %s", target, e)
+                # Rapport du run (job, état paused/failed) complété par l'erreur ;
+                # renvoyer le même fichier reprend l'import
+                self.last_report = {'state': 'failed', **(self.last_report or {}), 'error': str(e)}
+            finally:
+                self._lock.release()
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+        
+        try:
+            threading.Thread(target=run, name='bulk-import', daemon=True).start()
+        except BaseException:
+            self._lock.release()
+            raise
+        return True
 
-# ==================== ROUTES ADMIN (API) ====================
+    def snapshot(self):
+        current = self.current
+        return {
+            'running': self._lock.locked(),
+            'current': current.to_dict() if current else None,
+            'last': self.last_report,
+        }
 
-@app.route(f'/{app.config["ADMIN_PATH"]}/login', methods=['POST'])
-def admin_login():
-    data = request.json
-    username = data.get('username')
-    password = data.get('password')
-    
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM admin_users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    conn.close()
+bulk_importer = BulkImporter(
+    db_pool,
+    chunk_rows=app.config['IMPORT_CHUNK_ROWS'],
+    max_errors=app.config['IMPORT_MAX_ERRORS'],
+)
+
+class AppRequest(Request):
+    """MAX_CONTENT_LENGTH, sauf pour l'import qui reçoit des fichiers volumineux."""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'import_data':
+            return app.config['IMPORT_MAX_BYTES']
+        return super().max_content_length
+
+app.request_class = AppRequest
+
+@app.cli.command('import-data')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--target', type=click.Choice(sorted(IMPORT_TARGETS)), default='appointments')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+              help="Déduit de l'extension par défaut")
+@click.option('--dry-run', is_flag=True, help='Valider sans rien écrire')
+def import_data_command(path, target, fmt, dry_run):
+    """Importe un fichier CSV/NDJSON (éventuellement .gz) ; relancé, il reprend où il s'était arrêté."""
+    migrate_database()
+    started = time.perf_counter()
     
-    if user and verify_password(user[2], password):
-        session['admin_logged_in'] = True
-        session['username'] = username
-        return jsonify({'success': True})
+    def progress(report):
+        print(f"ligne {report.line} : {report.imported} importées, {report.rejected} rejetées")
     
-    return jsonify({'success': False, 'error': 'Identifiants incorrects'})
+    try:
+        report = bulk_importer.run(path, target, fmt, dry_run=dry_run, progress=progress)
+    except (EOFError, UnicodeDecodeError, OSError, csv.Error, sqlite3.Error, DatabaseBusy) as e:
+        # Fichier tronqué, mal encodé ou illisible : le job éventuel est en pause
+        job = (bulk_importer.last_report or {}).get('job')
+        resume = (f" ; import n°{job} en pause : relancez la commande pour le reprendre "
+                  f"ou abandonnez-le (flask import-abort {job})") if job else ''
+        raise click.ClickException(f"Import interrompu : {e}{resume}")
+    except (ImportInProgress, ValueError) as e:
+        raise click.ClickException(str(e))
+    for error in report.errors:
+        print(f"  ligne {error['line']} : {error['error']}")
+    if report.rejected > len(report.errors):
+        print(f"  ... et {report.rejected - len(report.errors)} autres erreurs")
+    verb = 'validées' if dry_run else 'importées'
+    print(f"{report.imported} lignes {verb}, {report.rejected} rejetées en {time.perf_counter() - started:.1f} s")
 
-@app.route(f'/{app.config["ADMIN_PATH"]}/logout', methods=['POST'])
-def admin_logout():
-    session.clear()
-    return jsonify({'success': True})
+@app.cli.command('import-abort')
+@click.argument('job_id', type=int)
+def import_abort_command(job_id):
+    """Abandonne un import inachevé et restaure index et triggers."""
+    try:
+        bulk_importer.abort(job_id)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Import n°{job_id} abandonné.")
 
-@app.route(f'/{app.config["ADMIN_PATH"]}/dashboard')
+@app.route(f'/{app.config["ADMIN_PATH"]}/import', methods=['GET', 'POST'])
 @admin_required
-def admin_dashboard():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Statistiques
-    cursor.execute("SELECT COUNT(*) FROM appointments")
-    total_appointments = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM appointments WHERE date(created_at) = date('now')")
-    today_appointments = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM appointments WHERE status = 'pending'")
-    pending_appointments = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM gallery")
-    total_cases = cursor.fetchone()[0]
-    
-    # Rendez-vous récents
-    cursor.execute("SELECT * FROM appointments ORDER BY created_at DESC LIMIT 10")
-    appointments = cursor.fetchall()
-    
-    appointments_list = []
-    for row in appointments:
-        appointments_list.append({
-            'id': row[0],
-            'full_name': row[1],
-            'email': row[2],
-            'phone': row[3],
-            'appointment_date': row[6],
-            'appointment_time': row[7],
-            'treatment_type': row[4],
-            'message': row[5],
-            'status': row[8],
-            'created_at': row[9]
-        })
-    
-    # Galerie
-    cursor.execute("SELECT * FROM gallery ORDER BY created_at DESC LIMIT 6")
-    gallery = cursor.fetchall()
-    
-    gallery_list = []
-    for row in gallery:
-        gallery_list.append({
-            'id': row[0],
-            'title': row[1],
-            'description': row[2],
-            'before_image': row[3],
-            'after_image': row[4],
-            'category': row[5],
-            'treatment_duration': row[6],
-            'visible': row[7],
-            'created_at': row[8]
-        })
-    
-    # Données pour graphiques
-    cursor.execute('''
-        SELECT 
-            strftime('%Y-%m', created_at) as month,
-            COUNT(*) as count
-        FROM appointments 
-        WHERE created_at >= date('now', '-6 months')
-        GROUP BY strftime('%Y-%m', created_at)
-        ORDER BY month
-    ''')
-    appointments_by_month = cursor.fetchall()
+def import_data():
+    """POST (fichier "file", target, dry_run) lance l'import en arrière-plan ; GET suit sa progression."""
+    if request.method == 'GET':
+        jobs = get_db().execute('''
+            SELECT id, target, source, state, line, imported, rejected, started_at, updated_at
+            FROM import_jobs ORDER BY id DESC LIMIT 10
+        ''').fetchall()
+        keys = ('id', 'target', 'source', 'state', 'line', 'imported', 'rejected', 'started_at', 'updated_at')
+        return jsonify({'success': True, **bulk_importer.snapshot(), 'jobs': [dict(zip(keys, job)) for job in jobs]})
     
-    conn.close()
+    target = request.form.get('target', 'appointments')
+    upload = request.files.get('file')
+    if target not in IMPORT_TARGETS:
+        return jsonify({'success': False, 'error': f'Cible invalide : {target}'}), 400
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'error': 'Fichier manquant'}), 400
+    fmt = request.form.get('format') or import_format(upload.filename)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'error': 'Format non reconnu (csv, ndjson ou jsonl, éventuellement .gz)'}), 400
     
-    return jsonify({
-        'stats': {
-            'total_appointments': total_appointments,
-            'today_appointments': today_appointments,
-            'pending_appointments': pending_appointments,
-            'total_cases': total_cases
-        },
-        'appointments': appointments_list,
-        'gallery': gallery_list,
-        'charts': {
-            'appointments_by_month': [
-                {'month': row[0], 'count': row[1]} for row in appointments_by_month
-            ]
-        }
-    })
+    os.makedirs(app.config['IMPORT_FOLDER'], exist_ok=True)
+    path = os.path.join(app.config['IMPORT_FOLDER'], secrets.token_hex(8))
+    upload.save(path)
+    started = bulk_importer.run_in_background(
+        path, target, fmt=fmt, dry_run=request.form.get('dry_run') == '1', source=upload.filename
+    )
+    if not started:
+        os.remove(path)
+        return jsonify({'success': False, 'error': 'Un import est déjà en cours'}), 409
+    return jsonify({'success': True, 'started': True}), 202
 
-@app.route(f'/{app.config["ADMIN_PATH"]}/appointments')
-@admin_required
-def get_appointments():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM appointments ORDER BY created_at DESC")
-    appointments = cursor.fetchall()
-    conn.close()
+# Statut cible -> statuts de départ autorisés. Un RDV annulé ne revient pas :
+# son créneau a pu être repris depuis
+STATUS_TRANSITIONS = {
+    'confirmed': ('pending',),
+    'cancelled': ('pending', 'confirmed'),
+}
+
+def change_status(app_id, target):
+    sources = STATUS_TRANSITIONS[target]
     
-    appointments_list = []
-    for row in appointments:
-        appointments_list.append({
-            'id': row[0],
-            'full_name': row[1],
-            'email': row[2],
-            'phone': row[3],
-            'treatment_type': row[4],
-            'message': row[5],
-            'appointment_date': row[6],
-            'appointment_time': row[7],
-            'status': row[8],
-            'created_at': row[9]
-        })
+    def update(cursor):
+        updated = cursor.execute(
+            f"UPDATE appointments SET status = ? WHERE id = ? AND status IN ({', '.join('?' for _ in sources)})",
+            (target, app_id, *sources)
+        ).rowcount
+        current = cursor.execute("SELECT status FROM appointments WHERE id = ?", (app_id,)).fetchone()
+        return updated, current
     
-    return jsonify(appointments_list)
+    try:
+        updated, current = run_write(update)
+    except Exception as e:
+        return db_error_response(e)
+    if current is None:
+        return jsonify({'success': False, 'error': 'Rendez-vous introuvable'}), 404
+    if updated:
+        publish_change('appointments', 'update', app_id)
+    elif current[0] != target:
+        return jsonify({'success': False, 'error': f"Transition refusée : {current[0]} -> {target}"}), 409
+    return jsonify({'success': True})
 
 @app.route(f'/{app.config["ADMIN_PATH"]}/appointment/<int:app_id>/confirm', methods=['POST'])
 @admin_required
 def confirm_appointment(app_id):
-    try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE appointments SET status = 'confirmed' WHERE id = ?", (app_id,))
-        conn.commit()
-        conn.close()
-        
-        return jsonify({'success': True})
-    
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return change_status(app_id, 'confirmed')
 
 @app.route(f'/{app.config["ADMIN_PATH"]}/appointment/<int:app_id>/cancel', methods=['POST'])
 @admin_required
 def cancel_appointment(app_id):
-    try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE appointments SET status = 'cancelled' WHERE id = ?", (app_id,))
-        conn.commit()
-        conn.close()
-        
-        return jsonify({'success': True})
+    return change_status(app_id, 'cancelled')
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/appointments/bulk-status', methods=['POST'])
+@admin_required
+def bulk_update_status():
+    """Confirme ou annule une liste de rendez-vous en une seule transaction.
+
+    Corps : {"ids": [...], "status": "confirmed" | "cancelled"}. Seules les
+    lignes dans un statut de départ valide sont modifiées ; la réponse donne
+    le résultat de chaque id : updated, unchanged (déjà dans ce statut),
+    invalid (transition refusée) ou not_found.
+    """
+    data = request.get_json(silent=True) or {}
+    target = data.get('status')
+    ids = data.get('ids')
+    if target not in STATUS_TRANSITIONS:
+        return jsonify({'success': False, 'error': f"Statut invalide : {target}"}), 400
+    if not isinstance(ids, list) or not ids or not all(type(i) is int for i in ids):
+        return jsonify({'success': False, 'error': 'ids doit être une liste non vide d\'entiers'}), 400
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > app.config['BULK_MAX_IDS']:
+        return jsonify({'success': False, 'error': f"{app.config['BULK_MAX_IDS']} rendez-vous maximum"}), 400
+    
+    sources = STATUS_TRANSITIONS[target]
+    id_placeholders = ', '.join('?' for _ in ids)
+    source_placeholders = ', '.join('?' for _ in sources)
     
+    def update(cursor):
+        updated = {row[0] for row in cursor.execute(f'''
+            UPDATE appointments SET status = ?
+            WHERE id IN ({id_placeholders}) AND status IN ({source_placeholders})
+            RETURNING id
+        ''', (target, *ids, *sources)).fetchall()}
+        current = dict(cursor.execute(
+            f"SELECT id, status FROM appointments WHERE id IN ({id_placeholders})", ids
+        ).fetchall())
+        return updated, current
+    
+    try:
+        updated, current = run_write(update)
+        publish_changes('appointments', 'update', sorted(updated))
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return db_error_response(e)
+    
+    results = {}
+    for app_id in ids:
+        if app_id in updated:
+            outcome = 'updated'
+        elif app_id not in current:
+            outcome = 'not_found'
+        elif current[app_id] == target:
+            outcome = 'unchanged'
+        else:
+            outcome = 'invalid'
+        results[app_id] = {'outcome': outcome, 'status': current.get(app_id)}
+    
+    return jsonify({'success': True, 'updated': len(updated), 'results': results})
 
 @app.route(f'/{app.config["ADMIN_PATH"]}/gallery', methods=['GET', 'POST'])
 @admin_required
 def manage_gallery():
     if request.method == 'GET':
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM gallery ORDER BY created_at DESC")
-        gallery = cursor.fetchall()
-        conn.close()
-        
-        gallery_list = []
-        for row in gallery:
-            gallery_list.append({
-                'id': row[0],
-                'title': row[1],
-                'description': row[2],
-                'before_image': row[3],
-                'after_image': row[4],
-                'category': row[5],
-                'treatment_duration': row[6],
-                'visible': row[7],
-                'created_at': row[8]
-            })
-        
-        return jsonify(gallery_list)
+        sql = GalleryItem.select_sql(order='created_at DESC')
+        
+        def build(conn, versions):
+            fmt = request.args.get('stream')
+            if fmt in STREAM_FORMATS:
+                return stream_rows(GalleryItem, sql, (), fmt)
+            
+            gallery_list = [item.to_dict() for item in GalleryItem.query(conn, sql)]
+            
+            return jsonify(gallery_list)
+        
+        return conditional_json(('gallery',), build, request.query_string)
     
     elif request.method == 'POST':
+        # JSON (URLs saisies) ou multipart avec les fichiers before_file / after_file
+        staged = {}
         try:
-            data = request.json
-            
-            conn = sqlite3.connect(DATABASE)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO gallery (title, description, before_image, after_image, category, treatment_duration)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                data.get('title'),
-                data.get('description', ''),
-                data.get('before_image', ''),
-                data.get('after_image', ''),
-                data.get('category', 'Invisalign'),
-                data.get('treatment_duration', '')
-            ))
+            if request.mimetype == 'multipart/form-data':
+                data = request.form
+                for column, field in UPLOAD_FIELDS.items():
+                    storage = request.files.get(field)
+                    if storage and storage.filename:
+                        staged[column] = blob_store.stage(storage)
+            else:
+                data = request.get_json(silent=True)
+                if not isinstance(data, dict):
+                    raise ValueError('Corps JSON ou multipart/form-data attendu')
+        except ValueError as e:
+            for upload in staged.values():
+                upload.discard()
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        status = 'processing' if staged and image_pipeline.available else 'ready'
+        
+        try:
+            def insert(cursor):
+                images = {column: data.get(column, '') for column in UPLOAD_FIELDS}
+                hashes = {column: None for column in UPLOAD_FIELDS}
+                blobs = {}
+                for column, upload in staged.items():
+                    path = blob_store.commit(cursor, upload)
+                    hashes[column] = upload.hash
+                    blobs[column] = (upload.hash, path)
+                    if status == 'ready':
+                        # Sans Pillow, les originaux sont servis tels quels
+                        images[column] = upload_url(path)
+                
+                cursor.execute('''
+                    INSERT INTO gallery (title, description, before_image, after_image, category, treatment_duration,
+                                         status, before_hash, after_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    data.get('title'),
+                    data.get('description', ''),
+                    images['before_image'],
+                    images['after_image'],
+                    data.get('category', 'Invisalign'),
+                    data.get('treatment_duration', ''),
+                    status,
+                    hashes['before_image'],
+                    hashes['after_image']
+                ))
+                return cursor.lastrowid, blobs
             
-            conn.commit()
-            conn.close()
+            try:
+                item_id, blobs = run_write(insert)
+            finally:
+                for upload in staged.values():
+                    upload.discard()
+            if status == 'processing':
+                image_pipeline.submit(item_id, blobs)
+            public_gallery.invalidate()
+            publish_change('gallery', 'insert', item_id)
             
-            return jsonify({'success': True})
+            return jsonify({'success': True, 'id': item_id, 'status': status})
         
         except Exception as e:
-            return jsonify({'success': False, 'error': str(e)})
+            return db_error_response(e)
 
 @app.route(f'/{app.config["ADMIN_PATH"]}/gallery/<int:item_id>', methods=['DELETE'])
 @admin_required
 def delete_gallery_item(item_id):
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM gallery WHERE id = ?", (item_id,))
-        conn.commit()
-        conn.close()
+        deleted = run_write(lambda cursor: cursor.execute(
+            "DELETE FROM gallery WHERE id = ?", (item_id,)
+        ).rowcount)
+        if deleted:
+            public_gallery.invalidate()
+            publish_change('gallery', 'delete', item_id)
         
         return jsonify({'success': True})
     
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return db_error_response(e)
+
+def latest_change(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+SYNC_MODELS = {'appointments': Appointment, 'gallery': GalleryItem}
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/changes')
+@admin_required
+def get_changes():
+    """Modifications depuis le curseur ?since= (lignes insérées/modifiées et ids supprimés).
+
+    reset=true signifie que le curseur est inconnu ou déjà purgé : le client
+    doit recharger complètement puis repartir du curseur renvoyé.
+    """
+    conn = get_db()
+    since = request.args.get('since', type=int)
+    latest = latest_change(conn)
+    oldest = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+    if since is None or since > latest or (oldest is not None and since < oldest - 1):
+        return jsonify({'cursor': latest, 'reset': True})
+    
+    limit = app.config['CHANGES_MAX_BATCH']
+    entries = conn.execute(
+        "SELECT seq, table_name, row_id, op FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+        (since, limit)
+    ).fetchall()
+    
+    # Seule la dernière opération par ligne compte
+    last_op = {}
+    for _, table, row_id, op in entries:
+        last_op[(table, row_id)] = op
+    
+    changes = {}
+    for table, model in SYNC_MODELS.items():
+        deleted = [row_id for (t, row_id), op in last_op.items() if t == table and op == 'delete']
+        touched = [row_id for (t, row_id), op in last_op.items() if t == table and op != 'delete']
+        upserted = []
+        if touched:
+            placeholders = ', '.join('?' for _ in touched)
+            upserted = [
+                row.to_dict() for row in model.query(
+                    conn, model.select_sql(f"WHERE id IN ({placeholders})"), touched
+                )
+            ]
+        changes[table] = {'upserted': upserted, 'deleted': deleted}
+    
+    return jsonify({
+        'cursor': entries[-1][0] if entries else since,
+        'reset': False,
+        'has_more': len(entries) == limit,
+        'stats': read_stats(conn),
+        'changes': changes
+    })
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/events')
+@admin_required
+def admin_events():
+    """Flux SSE : nouveaux RDV, changements de statut et de galerie."""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+    sub = broadcaster.subscribe(last_event_id)
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                events = broadcaster.wait(sub, heartbeat)
+                if sub.overflowed:
+                    # Client en retard : il resynchronise via /changes puis se
+                    # reconnecte à partir de l'événement courant
+                    yield f'id: {broadcaster.latest_id()}\nevent: resync\ndata: {{}}\n\n'
+                    return
+                if not events:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield ''.join(f'id: {event_id}\nevent: {name}\ndata: {data}\n\n'
+                              for event_id, name, data in events)
+        finally:
+            broadcaster.unsubscribe(sub)
+    
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/images/gc', methods=['GET', 'POST'])
+@admin_required
+def images_gc():
+    """POST lance une passe de GC en arrière-plan ; GET renvoie le dernier rapport."""
+    if request.method == 'POST':
+        started = blob_store.collect_in_background()
+        return jsonify({'success': True, 'started': started, **blob_store.snapshot()}), 202
+    return jsonify({'success': True, **blob_store.snapshot()})
+
+@app.route(f'/{app.config["ADMIN_PATH"]}/db-stats')
+@admin_required
+def db_stats():
+    journal_mode = get_db().execute('PRAGMA journal_mode').fetchone()[0]
+    return jsonify({
+        'storage_mode': app.config['DB_STORAGE_MODE'],
+        'journal_mode': journal_mode,
+        'busy_timeout_ms': app.config['DB_BUSY_TIMEOUT_MS'],
+        'writes': write_stats.snapshot(),
+        'booking_writer': booking_writer.snapshot(),
+        'response_cache': response_cache.snapshot(),
+        'events': broadcaster.snapshot(),
+        'public_gallery': public_gallery.snapshot(),
+        'images': image_pipeline.snapshot(),
+        'image_store': blob_store.snapshot(),
+        'image_cache': image_cache.snapshot()
+    })
 
 # ==================== PAGE ADMIN PROFESSIONNELLE ====================
 
@@ -1021,8 +4671,7 @@ ADMIN_PAGE = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Dashboard Admin | Savaş Smile</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+    {{ font_links|safe }}
     <style>
         * {
             margin: 0;
@@ -1357,6 +5006,20 @@ ADMIN_PAGE = '''
             overflow: hidden;
         }
         
+        .blur-up {
+            background-size: cover;
+            background-position: center;
+        }
+        
+        .gallery-status {
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            gap: 0.5rem;
+            color: var(--gray-text);
+            background: var(--dark-bg);
+        }
+        
         .gallery-image img {
             width: 100%;
             height: 100%;
@@ -1642,18 +5305,48 @@ ADMIN_PAGE = '''
                     <div class="card-header">
                         <h3 class="card-title">Tous les rendez-vous</h3>
                         <div>
+                            <input type="search" id="filter-search" class="form-control" style="display: inline-block; width: 220px;"
+                                   placeholder="Nom, email, téléphone..." oninput="searchAppointments()">
                             <select id="filter-status" class="form-control" style="display: inline-block; width: auto;" onchange="loadAppointments()">
                                 <option value="">Tous les statuts</option>
                                 <option value="pending">En attente</option>
                                 <option value="confirmed">Confirmés</option>
                                 <option value="cancelled">Annulés</option>
                             </select>
+                            <select id="filter-treatment" class="form-control" style="display: inline-block; width: auto;" onchange="loadAppointments()">
+                                <option value="">Tous les traitements</option>
+                                <option value="invisalign">Invisalign</option>
+                                <option value="blanchiment">Blanchiment</option>
+                                <option value="implant">Implant</option>
+                                <option value="consultation">Consultation</option>
+                            </select>
+                            <input type="date" id="filter-from" title="Du : date de la demande (liste), date du rendez-vous (export)" class="form-control" style="display: inline-block; width: auto;" onchange="loadAppointments()">
+                            <input type="date" id="filter-to" title="Au : date de la demande (liste), date du rendez-vous (export)" class="form-control" style="display: inline-block; width: auto;" onchange="loadAppointments()">
+                            <button class="btn btn-outline btn-sm" onclick="exportAppointments('csv')"
+                                    title="Export des RDV dont la date de rendez-vous est dans la période">
+                                <i class="fas fa-file-csv"></i> CSV
+                            </button>
+                            <button class="btn btn-outline btn-sm" onclick="exportAppointments('xlsx')"
+                                    title="Export des RDV dont la date de rendez-vous est dans la période">
+                                <i class="fas fa-file-excel"></i> Excel
+                            </button>
                         </div>
                     </div>
+                    <div id="bulk-actions" style="display: none; align-items: center; gap: 1rem; margin-bottom: 1rem;">
+                        <span id="bulk-count"></span>
+                        <button class="btn btn-success btn-sm" onclick="bulkUpdateStatus('confirmed')">
+                            <i class="fas fa-check"></i> Confirmer la sélection
+                        </button>
+                        <button class="btn btn-danger btn-sm" onclick="bulkUpdateStatus('cancelled')">
+                            <i class="fas fa-times"></i> Annuler la sélection
+                        </button>
+                        <span id="bulk-result" style="color: var(--gray-text);"></span>
+                    </div>
                     <div class="table-container">
                         <table id="all-appointments">
                             <thead>
                                 <tr>
+                                    <th><input type="checkbox" id="select-all-appointments" onchange="toggleAllAppointments(this.checked)"></th>
                                     <th>Patient</th>
                                     <th>Email</th>
                                     <th>Téléphone</th>
@@ -1667,6 +5360,14 @@ ADMIN_PAGE = '''
                             <tbody></tbody>
                         </table>
                     </div>
+                    <div style="text-align: center; margin-top: 1rem;">
+                        <button id="load-more-appointments" class="btn btn-outline" style="display: none;" onclick="loadAppointments(true)">
+                            Charger plus <i class="fas fa-chevron-down"></i>
+                        </button>
+                        <p id="search-truncated" style="display: none; color: #94a3b8; margin-top: 0.5rem;">
+                            Recherche limitée aux correspondances les plus récentes : précisez les termes pour voir les plus anciennes.
+                        </p>
+                    </div>
                 </div>
             </div>
             
@@ -1751,13 +5452,16 @@ ADMIN_PAGE = '''
                 <textarea class="form-control" id="gallery-description" rows="3"></textarea>
             </div>
             <div class="form-group">
-                <label>URL image avant</label>
-                <input type="text" class="form-control" id="gallery-before">
+                <label>Photo avant (fichier ou URL)</label>
+                <input type="file" class="form-control" id="gallery-before-file" accept="image/png,image/jpeg,image/gif,image/webp">
+                <input type="text" class="form-control" id="gallery-before" placeholder="https://..." style="margin-top: 0.5rem;">
             </div>
             <div class="form-group">
-                <label>URL image après</label>
-                <input type="text" class="form-control" id="gallery-after">
+                <label>Photo après (fichier ou URL)</label>
+                <input type="file" class="form-control" id="gallery-after-file" accept="image/png,image/jpeg,image/gif,image/webp">
+                <input type="text" class="form-control" id="gallery-after" placeholder="https://..." style="margin-top: 0.5rem;">
             </div>
+            <div id="gallery-error" style="color: var(--danger); margin-bottom: 1rem; display: none;"></div>
             <div class="form-group">
                 <label>Catégorie</label>
                 <select class="form-control" id="gallery-category">
@@ -1784,6 +5488,7 @@ ADMIN_PAGE = '''
     
     <script>
         const ADMIN_PATH = "{{ admin_path }}";
+        const IMAGE_WIDTHS = {{ image_widths|tojson }};
         let currentUser = '';
         
         // Login
@@ -1807,7 +5512,8 @@ ADMIN_PAGE = '''
                 document.getElementById('admin-container').style.display = 'flex';
                 document.getElementById('user-name').textContent = username;
                 document.getElementById('user-avatar').textContent = username.charAt(0).toUpperCase();
-                loadDashboard();
+                await loadDashboard();
+                connectEvents();
             } else {
                 document.getElementById('login-alert').style.display = 'block';
                 setTimeout(() => {
@@ -1857,9 +5563,17 @@ ADMIN_PAGE = '''
         });
         
         // Dashboard
+        // cache: 'no-cache' : le navigateur revalide avec If-None-Match et
+        // réutilise sa copie locale sur un 304 au lieu de tout retélécharger
         async function loadDashboard() {
-            const response = await fetch(`/${ADMIN_PATH}/dashboard`);
-            const data = await response.json();
+            const response = await fetch(`/${ADMIN_PATH}/dashboard`, { cache: 'no-cache' });
+            dashboardState = await response.json();
+            syncCursor = dashboardState.cursor;
+            renderDashboard();
+        }
+        
+        function renderDashboard() {
+            const data = dashboardState;
             
             // Update stats cards
             document.getElementById('stats-cards').innerHTML = `
@@ -1930,9 +5644,7 @@ ADMIN_PAGE = '''
             // Update gallery preview
             document.getElementById('gallery-preview').innerHTML = data.gallery.map(item => `
                 <div class="gallery-item">
-                    <div class="gallery-image">
-                        <img src="${item.before_image}" alt="${item.title}">
-                    </div>
+                    ${galleryImage(item)}
                     <div class="gallery-content">
                         <div class="gallery-title">${item.title}</div>
                         <div class="gallery-description">${item.description}</div>
@@ -1945,20 +5657,14 @@ ADMIN_PAGE = '''
         }
         
         // Appointments
-        async function loadAppointments() {
-            const statusFilter = document.getElementById('filter-status').value;
-            let url = `/${ADMIN_PATH}/appointments`;
-            
-            const response = await fetch(url);
-            const appointments = await response.json();
-            
-            const filteredAppointments = statusFilter 
-                ? appointments.filter(app => app.status === statusFilter)
-                : appointments;
-            
-            const tbody = document.querySelector('#all-appointments tbody');
-            tbody.innerHTML = filteredAppointments.map(app => `
+        let appointmentsCursor = null;
+        let loadedAppointments = null;
+        
+        function appointmentRow(app) {
+            return `
                 <tr>
+                    <td><input type="checkbox" class="select-appointment" value="${app.id}"
+                               ${selectedAppointments.has(app.id) ? 'checked' : ''} onchange="toggleAppointment(${app.id}, this.checked)"></td>
                     <td>${app.full_name}</td>
                     <td>${app.email}</td>
                     <td>${app.phone}</td>
@@ -1973,35 +5679,178 @@ ADMIN_PAGE = '''
                         ` : ''}
                     </td>
                 </tr>
-            `).join('');
+            `;
         }
         
-        async function confirmAppointment(id) {
-            await fetch(`/${ADMIN_PATH}/appointment/${id}/confirm`, { method: 'POST' });
-            loadDashboard();
-            if (document.getElementById('appointments-tab').style.display !== 'none') {
-                loadAppointments();
+        // Sélection multiple : conservée à travers les rendus et mises à jour temps réel
+        const selectedAppointments = new Set();
+        
+        function updateBulkActions() {
+            const count = selectedAppointments.size;
+            document.getElementById('bulk-actions').style.display = count ? 'flex' : 'none';
+            document.getElementById('bulk-count').textContent = `${count} sélectionné(s)`;
+        }
+        
+        function toggleAppointment(id, checked) {
+            if (checked) selectedAppointments.add(id); else selectedAppointments.delete(id);
+            updateBulkActions();
+        }
+        
+        function toggleAllAppointments(checked) {
+            (loadedAppointments || []).forEach(app => toggleAppointment(app.id, checked));
+            renderAppointments();
+        }
+        
+        async function bulkUpdateStatus(status) {
+            const ids = Array.from(selectedAppointments);
+            const response = await fetch(`/${ADMIN_PATH}/appointments/bulk-status`, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({ ids, status })
+            });
+            const data = await response.json();
+            if (!data.success) {
+                alert('Erreur: ' + data.error);
+                return;
             }
+            
+            // Les lignes modifiées arrivent par le flux temps réel ; on garde
+            // sélectionnées celles qui n'ont pas pu changer de statut
+            const skipped = Object.entries(data.results).filter(([, result]) => result.outcome !== 'updated');
+            selectedAppointments.clear();
+            skipped.forEach(([id]) => selectedAppointments.add(Number(id)));
+            document.getElementById('bulk-result').textContent = skipped.length
+                ? `${data.updated} modifié(s), ${skipped.length} ignoré(s) (statut incompatible)`
+                : `${data.updated} modifié(s)`;
+            document.getElementById('select-all-appointments').checked = false;
+            updateBulkActions();
+            renderAppointments();
+            syncChanges();
         }
         
-        async function cancelAppointment(id) {
-            await fetch(`/${ADMIN_PATH}/appointment/${id}/cancel`, { method: 'POST' });
-            loadDashboard();
-            if (document.getElementById('appointments-tab').style.display !== 'none') {
-                loadAppointments();
+        function appointmentFilterParams() {
+            const params = new URLSearchParams();
+            const filters = {
+                status: document.getElementById('filter-status').value,
+                treatment: document.getElementById('filter-treatment').value,
+                from: document.getElementById('filter-from').value,
+                to: document.getElementById('filter-to').value
+            };
+            Object.entries(filters).forEach(([key, value]) => {
+                if (value) params.set(key, value);
+            });
+            return params;
+        }
+        
+        // Téléchargement direct : le navigateur reçoit le fichier en flux
+        function exportAppointments(format) {
+            const params = appointmentFilterParams();
+            params.set('format', format);
+            window.location.href = `/${ADMIN_PATH}/appointments/export?${params}`;
+        }
+        
+        // Filtres et pagination côté serveur ; append = page suivante
+        async function loadAppointments(append = false) {
+            const params = appointmentFilterParams();
+            if (append && appointmentsCursor) params.set('cursor', appointmentsCursor);
+            
+            // Avec une recherche : résultats classés par pertinence côté serveur
+            const search = document.getElementById('filter-search').value.trim();
+            if (search) params.set('q', search);
+            const endpoint = search ? 'appointments/search' : 'appointments';
+            
+            const response = await fetch(`/${ADMIN_PATH}/${endpoint}?${params}`, { cache: 'no-cache' });
+            const page = await response.json();
+            
+            if (append) {
+                const tbody = document.querySelector('#all-appointments tbody');
+                tbody.insertAdjacentHTML('beforeend', page.items.map(appointmentRow).join(''));
+                loadedAppointments = loadedAppointments.concat(page.items);
+            } else {
+                loadedAppointments = page.items;
+                renderAppointments();
+            }
+            
+            appointmentsCursor = page.next_cursor;
+            document.getElementById('load-more-appointments').style.display = appointmentsCursor ? 'inline-flex' : 'none';
+            document.getElementById('search-truncated').style.display = page.truncated ? 'block' : 'none';
+        }
+        
+        let searchTimer = null;
+        
+        function searchAppointments() {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => loadAppointments(), 250);
+        }
+        
+        function renderAppointments() {
+            const tbody = document.querySelector('#all-appointments tbody');
+            tbody.innerHTML = loadedAppointments.map(appointmentRow).join('');
+        }
+        
+        // Même règle que les filtres serveur, pour trier les lignes reçues par /changes
+        function matchesAppointmentFilters(app) {
+            const status = document.getElementById('filter-status').value;
+            const treatment = document.getElementById('filter-treatment').value;
+            const from = document.getElementById('filter-from').value;
+            const to = document.getElementById('filter-to').value;
+            const day = (app.created_at || '').slice(0, 10);
+            return (!status || app.status === status)
+                && (!treatment || app.treatment_type === treatment)
+                && (!from || day >= from)
+                && (!to || day <= to);
+        }
+        
+        async function setAppointmentStatus(id, action) {
+            const response = await fetch(`/${ADMIN_PATH}/appointment/${id}/${action}`, { method: 'POST' });
+            const data = await response.json();
+            if (!data.success) {
+                alert('Erreur: ' + data.error);
             }
+            syncChanges();
+        }
+        
+        async function confirmAppointment(id) {
+            await setAppointmentStatus(id, 'confirm');
+        }
+        
+        async function cancelAppointment(id) {
+            await setAppointmentStatus(id, 'cancel');
         }
         
         // Gallery
+        let galleryItems = null;
+        
+        function galleryImage(item) {
+            if (item.status === 'processing') {
+                return `<div class="gallery-image gallery-status"><i class="fas fa-cog fa-spin"></i> Traitement des photos...</div>`;
+            }
+            if (item.status === 'failed') {
+                return `<div class="gallery-image gallery-status"><i class="fas fa-exclamation-triangle"></i> Échec du traitement</div>`;
+            }
+            if (item.before_hash && item.before_width) {
+                const top = Math.min(item.before_width, IMAGE_WIDTHS[IMAGE_WIDTHS.length - 1]);
+                const srcset = IMAGE_WIDTHS.filter(w => w < top).concat([top])
+                    .map(w => `/img/${item.before_hash}?w=${w} ${w}w`).join(', ');
+                return `
+                    <div class="gallery-image blur-up" style="background-color: ${item.before_color}; background-image: url(${item.before_placeholder});">
+                        <img src="/img/${item.before_hash}?w=640" srcset="${srcset}" sizes="(max-width: 768px) 100vw, 360px"
+                             width="${item.before_width}" height="${item.before_height}" loading="lazy" decoding="async" alt="${item.title}">
+                    </div>`;
+            }
+            return `<div class="gallery-image"><img src="${item.before_image}" loading="lazy" decoding="async" alt="${item.title}"></div>`;
+        }
+        
         async function loadGallery() {
-            const response = await fetch(`/${ADMIN_PATH}/gallery`);
-            const gallery = await response.json();
-            
-            document.getElementById('full-gallery').innerHTML = gallery.map(item => `
+            const response = await fetch(`/${ADMIN_PATH}/gallery`, { cache: 'no-cache' });
+            galleryItems = await response.json();
+            renderGallery();
+        }
+        
+        function renderGallery() {
+            document.getElementById('full-gallery').innerHTML = galleryItems.map(item => `
                 <div class="gallery-item">
-                    <div class="gallery-image">
-                        <img src="${item.before_image}" alt="${item.title}">
-                    </div>
+                    ${galleryImage(item)}
                     <div class="gallery-content">
                         <div class="gallery-title">${item.title}</div>
                         <div class="gallery-description">${item.description}</div>
@@ -2025,41 +5874,161 @@ ADMIN_PAGE = '''
         }
         
         async function addGalleryItem() {
-            const item = {
-                title: document.getElementById('gallery-title').value,
-                description: document.getElementById('gallery-description').value,
-                before_image: document.getElementById('gallery-before').value,
-                after_image: document.getElementById('gallery-after').value,
-                category: document.getElementById('gallery-category').value,
-                treatment_duration: document.getElementById('gallery-duration').value
-            };
+            // Envoi multipart : les photos sont traitées en arrière-plan côté serveur
+            const form = new FormData();
+            form.append('title', document.getElementById('gallery-title').value);
+            form.append('description', document.getElementById('gallery-description').value);
+            form.append('before_image', document.getElementById('gallery-before').value);
+            form.append('after_image', document.getElementById('gallery-after').value);
+            form.append('category', document.getElementById('gallery-category').value);
+            form.append('treatment_duration', document.getElementById('gallery-duration').value);
+            for (const [field, input] of [['before_file', 'gallery-before-file'], ['after_file', 'gallery-after-file']]) {
+                const file = document.getElementById(input).files[0];
+                if (file) form.append(field, file);
+            }
             
             const response = await fetch(`/${ADMIN_PATH}/gallery`, {
                 method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify(item)
+                body: form
             });
             
             const data = await response.json();
+            const error = document.getElementById('gallery-error');
             
             if (data.success) {
+                error.style.display = 'none';
                 closeModal();
-                loadGallery();
-                loadDashboard();
+                syncChanges();
+            } else {
+                error.textContent = data.error;
+                error.style.display = 'block';
             }
         }
         
         async function deleteGalleryItem(id) {
             if (confirm('Supprimer ce cas de la galerie ?')) {
                 await fetch(`/${ADMIN_PATH}/gallery/${id}`, { method: 'DELETE' });
-                loadGallery();
-                loadDashboard();
+                syncChanges();
+            }
+        }
+        
+        // Synchronisation incrémentale : seules les lignes modifiées depuis
+        // syncCursor sont téléchargées puis fusionnées dans l'état local
+        let dashboardState = null;
+        let syncCursor = null;
+        
+        function byNewest(a, b) {
+            if (a.created_at !== b.created_at) return a.created_at < b.created_at ? 1 : -1;
+            return b.id - a.id;
+        }
+        
+        function mergeRows(rows, change, keep = () => true, max = Infinity, order = byNewest) {
+            const deleted = new Set(change.deleted);
+            const updates = new Map(change.upserted.map(row => [row.id, row]));
+            const merged = rows
+                .filter(row => !deleted.has(row.id))
+                .map(row => {
+                    const updated = updates.get(row.id);
+                    updates.delete(row.id);
+                    return updated || row;
+                });
+            updates.forEach(row => merged.push(row));
+            const kept = merged.filter(keep);
+            return (order ? kept.sort(order) : kept).slice(0, max);
+        }
+        
+        async function syncChanges() {
+            if (syncCursor === null) return loadDashboard();
+            
+            const response = await fetch(`/${ADMIN_PATH}/changes?since=${syncCursor}`);
+            const data = await response.json();
+            
+            if (data.reset) {
+                await loadDashboard();
+                if (loadedAppointments !== null) loadAppointments();
+                if (galleryItems !== null) loadGallery();
+                return;
+            }
+            
+            syncCursor = data.cursor;
+            await applyChanges(data.changes, data.stats);
+            
+            if (data.has_more) syncChanges();
+        }
+        
+        async function applyChanges(changes, stats) {
+            if (dashboardState === null) return;
+            const { appointments, gallery } = changes;
+            
+            dashboardState.stats = stats;
+            dashboardState.appointments = mergeRows(dashboardState.appointments, appointments, () => true, 10);
+            dashboardState.gallery = mergeRows(dashboardState.gallery, gallery, () => true, 6);
+            if (dashboardState.gallery.length < Math.min(6, stats.total_cases)) {
+                // Un cas supprimé laisse un trou dans l'aperçu : on recharge le bloc
+                await loadDashboard();
+            } else {
+                renderDashboard();
             }
+            
+            if (loadedAppointments !== null) {
+                if (document.getElementById('filter-search').value.trim()) {
+                    // Résultats de recherche : mise à jour sur place, ordre de pertinence conservé
+                    const shown = new Set(loadedAppointments.map(app => app.id));
+                    loadedAppointments = mergeRows(loadedAppointments, appointments,
+                        app => shown.has(app.id) && matchesAppointmentFilters(app), Infinity, null);
+                } else {
+                    loadedAppointments = mergeRows(loadedAppointments, appointments, matchesAppointmentFilters);
+                }
+                renderAppointments();
+            }
+            if (galleryItems !== null) {
+                galleryItems = mergeRows(galleryItems, gallery);
+                renderGallery();
+            }
+        }
+        
+        // Flux temps réel : chaque événement SSE est converti en delta et
+        // fusionné comme une réponse de /changes. Le navigateur se reconnecte
+        // seul en envoyant Last-Event-ID ; "resync" signale un retard.
+        let eventSource = null;
+        
+        let pendingEvents = null;
+        let pendingStats = null;
+        
+        function flushEvents() {
+            const changes = pendingEvents;
+            pendingEvents = null;
+            applyChanges(changes, pendingStats);
+        }
+        
+        function connectEvents() {
+            if (eventSource) eventSource.close();
+            eventSource = new EventSource(`/${ADMIN_PATH}/events`);
+            ['appointments', 'gallery'].forEach(table => {
+                eventSource.addEventListener(table, e => {
+                    const event = JSON.parse(e.data);
+                    if (pendingEvents === null) {
+                        // Rafale d'événements : un seul rendu par tranche de 50 ms
+                        pendingEvents = {
+                            appointments: { upserted: [], deleted: [] },
+                            gallery: { upserted: [], deleted: [] }
+                        };
+                        setTimeout(flushEvents, 50);
+                    }
+                    if (event.op === 'delete') {
+                        pendingEvents[table].deleted.push(...event.ids);
+                    } else {
+                        pendingEvents[table].upserted.push(...event.rows);
+                    }
+                    pendingStats = event.stats;
+                });
+            });
+            eventSource.addEventListener('resync', () => syncChanges());
         }
         
         // Statistics
         async function loadStats() {
-            const response = await fetch(`/${ADMIN_PATH}/dashboard`);
+            const response = await fetch(`/${ADMIN_PATH}/dashboard`, { cache: 'no-cache' });
             const data = await response.json();
             
             // Simple chart data for demo
@@ -2143,22 +6112,69 @@ ADMIN_PAGE = '''
             document.getElementById('login-container').style.display = 'flex';
             document.getElementById('username').value = '';
             document.getElementById('password').value = '';
-        }
-        
-        // Auto-refresh every 30 seconds
-        setInterval(() => {
-            if (document.getElementById('dashboard-tab').style.display !== 'none') {
-                loadDashboard();
+            if (eventSource) {
+                eventSource.close();
+                eventSource = null;
             }
-        }, 30000);
+            dashboardState = null;
+            syncCursor = null;
+            loadedAppointments = null;
+            galleryItems = null;
+        }
     </script>
 </body>
 </html>
 '''
 
+admin_page_render = PrerenderedPage(
+    'admin',
+    lambda: ADMIN_PAGE,
+    lambda: {
+        'admin_path': app.config['ADMIN_PATH'],
+        'font_links': font_links('admin'),
+        'image_widths': list(app.config['IMAGE_RESIZE_WIDTHS']),
+    },
+    cache_control='private, no-cache',
+)
+
 @app.route(f'/{app.config["ADMIN_PATH"]}/page')
 def admin_page():
-    return render_template_string(ADMIN_PAGE, admin_path=app.config['ADMIN_PATH'])
+    return admin_page_render.response()
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Pré-rend les pages et écrit leurs CSS/JS versionnés dans ASSETS_FOLDER."""
+    for page in (home_page, admin_page_render):
+        with app.test_request_context('/'):
+            variants, _ = page.variants()
+        print(f"{page.name} : {len(variants['identity'])} o de HTML")
+    for filename in sorted(os.listdir(app.config['ASSETS_FOLDER'])):
+        size = os.path.getsize(os.path.join(app.config['ASSETS_FOLDER'], filename))
+        print(f"  {filename} ({size} o)")
+
+@app.cli.command('bench-home')
+@click.option('--requests', 'count', default=2000, show_default=True)
+def bench_home_command(count):
+    """Requêtes/s sur / : rendu Jinja à chaque appel contre page pré-rendue."""
+    for name, headers, view in (
+        ('render_template_string', {}, lambda: app.make_response(
+            render_template_string(HTML_TEMPLATE, font_links=font_links('home'),
+                                   gallery_html=public_gallery.get(), **gallery_image_context())
+        )),
+        ('pré-rendu (identity)', {}, home),
+        ('pré-rendu (gzip)', {'Accept-Encoding': 'gzip, br'}, home),
+    ):
+        with app.test_request_context('/', headers=headers):
+            view()
+            started = time.perf_counter()
+            for _ in range(count):
+                view()
+            elapsed = time.perf_counter() - started
+        print(f"{name:<24} {count / elapsed:>10.0f} req/s")
+    
+    with app.test_request_context('/'):
+        variants, _ = home_page.variants()
+    print("Tailles : " + ', '.join(f"{k}={len(v)} o" for k, v in variants.items()))
 
 # ==================== LANCEMENT ====================
 
@@ -2178,4 +6194,9 @@ if __name__ == '__main__':
     print("\n⏹️  Pour arrêter : Ctrl+C")
     print("=" * 70)
     
+    # Lancement local : schéma à jour et données de démonstration
+    migrate_database()
+    with db_pool.connection() as conn:
+        seed_demo_data(conn)
+    
     app.run(debug=True, use_reloader=False, port=5000)
\ No newline at end of file